@@ -1,7 +1,9 @@
 from typing import List, Dict, Any
 import re
-from models.schemas import FinancialDataPoint, QueryType, DocumentMetadata, FinancialMetric, DocumentType, Quarter
-from data_processing.vector_store import FinancialVectorStore
+from models.schemas import (FinancialDataPoint, QueryType, DocumentMetadata, Quarter,
+                            metric_from_str, quarter_from_str, document_type_from_str)
+from tools.document_retriever import get_vector_store
+from data_processing.table_metrics import strip_non_numeric
 from tools.temporal_reasoning import TemporalReasoningTool
 
 class FinancialDataValidator:
@@ -75,7 +77,7 @@ class FinancialDataValidator:
 
 class FinancialDataExtractor:
     def __init__(self):
-        self.vector_store = FinancialVectorStore()
+        self.vector_store = get_vector_store()
         self.temporal_tool = TemporalReasoningTool()
     
         # ENHANCED REGEX PATTERNS - FAB SPECIFIC
@@ -228,8 +230,8 @@ class FinancialDataExtractor:
         cleaned_metadata = {
             "bank": raw_metadata.get("bank", "FAB"),
             "year": int(raw_metadata.get("year", 2022)),  # Ensure int
-            "quarter": Quarter(raw_metadata.get("quarter", "Q1")),
-            "document_type": DocumentType(raw_metadata.get("document_type", "financial_statement")),
+            "quarter": quarter_from_str(raw_metadata.get("quarter", "Q1")),
+            "document_type": document_type_from_str(raw_metadata.get("document_type", "financial_statement")),
             "document_category": raw_metadata.get("document_category", ""),
             "file_path": raw_metadata.get("file_path", ""),
             "reporting_date": raw_metadata.get("reporting_date"),
@@ -244,9 +246,18 @@ class FinancialDataExtractor:
         else:
             period = f"{cleaned_metadata['year']}_{cleaned_metadata['quarter'].value}"  # Quarterly format
         
+        # One validated metadata model per chunk, shared by all of its data points
+        try:
+            document_metadata = DocumentMetadata(**cleaned_metadata)
+        except Exception as e:
+            print(f"       Invalid chunk metadata, skipping chunk: {e}")
+            return metrics
+        
         # NEW: EXTRACT FROM TABLES IF AVAILABLE (from enhanced document parser)
         if chunk.get("extracted_metrics"):
-            table_metrics = self._extract_metrics_from_table_data(chunk["extracted_metrics"], cleaned_metadata, raw_metadata)
+            table_metrics = self._extract_metrics_from_table_data(
+                chunk["extracted_metrics"], cleaned_metadata, raw_metadata, document_metadata
+            )
             metrics.extend(table_metrics)
             print(f"    Extracted {len(table_metrics)} metrics from table structure")
         
@@ -267,10 +278,10 @@ class FinancialDataExtractor:
                         if validation["is_valid"]:
                             try:
                                 data_point = FinancialDataPoint(
-                                    metric=FinancialMetric(metric_name),
+                                    metric=metric_from_str(metric_name),
                                     value=numeric_value,
                                     period=period,  # Use the dynamically generated period
-                                    metadata=DocumentMetadata(**cleaned_metadata),
+                                    metadata=document_metadata,
                                     source_page=raw_metadata.get('page_number', 1),
                                     source_section=raw_metadata.get('section_type', 'unknown'),
                                     confidence=validation.get("confidence", 0.7)
@@ -284,7 +295,8 @@ class FinancialDataExtractor:
         
         return metrics
     
-    def _extract_metrics_from_table_data(self, extracted_metrics: Dict, cleaned_metadata: Dict, raw_metadata: Dict) -> List[FinancialDataPoint]:
+    def _extract_metrics_from_table_data(self, extracted_metrics: Dict, cleaned_metadata: Dict, raw_metadata: Dict,
+                                         document_metadata: DocumentMetadata) -> List[FinancialDataPoint]:
         """Extract metrics from structured table data"""
         metrics = []
         
@@ -302,10 +314,10 @@ class FinancialDataExtractor:
                     final_confidence = max(validation.get("confidence", 0.7), confidence)
                     
                     data_point = FinancialDataPoint(
-                        metric=FinancialMetric(metric_name),
+                        metric=metric_from_str(metric_name),
                         value=value,
                         period=f"{cleaned_metadata['year']}_{cleaned_metadata['quarter'].value}",
-                        metadata=DocumentMetadata(**cleaned_metadata),
+                        metadata=document_metadata,
                         source_page=raw_metadata.get('page_number', 1),
                         source_section=raw_metadata.get('section_type', 'table'),
                         confidence=final_confidence
@@ -402,7 +414,7 @@ class FinancialDataExtractor:
             
         try:
             # Remove commas and spaces, keep decimal points and numbers
-            cleaned = re.sub(r'[^\d.]', '', value_str.strip())
+            cleaned = strip_non_numeric(value_str)
             if not cleaned:
                 return 0.0
                 
@@ -9,6 +9,9 @@ from agents.synthesis_agent import SynthesisAgent
 from agents.validation_agent import ValidationAgent
 
 class OrchestratorAgent:
+    # Bump when agents, prompts or models change; cached test-suite responses are keyed on it
+    VERSION = "1"
+    
     def __init__(self):
         self.workflow = self._build_workflow()
         self.query_classifier = QueryClassifier()
@@ -62,7 +62,7 @@ async def analyze_financial_query(request: QueryRequest):
         
         return QueryResponse(
             answer=result["answer"],
-            data_points=[dp.dict() for dp in result["data_points"]],
+            data_points=[dp.model_dump() for dp in result["data_points"]],
             calculations=result["calculations"],
             sources=result["sources"],
             confidence=result["confidence"],
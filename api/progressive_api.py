@@ -34,10 +34,10 @@ print(" Initializing FAB Financial Analyzer...")
 
 # Step 1: Basic components (these work)
 from config.settings import settings
-from data_processing.vector_store import FinancialVectorStore
+from tools.document_retriever import get_vector_store
 from agents.financial_extractor import FinancialDataExtractor
 
-vector_store = FinancialVectorStore()
+vector_store = get_vector_store()
 data_extractor = FinancialDataExtractor()
 
 print(" Basic components initialized")
@@ -66,7 +66,7 @@ async def analyze_financial_query(request: QueryRequest):
             
             return QueryResponse(
                 answer=result.get("answer", "No answer generated"),
-                data_points=[dp.dict() for dp in result.get("data_points", [])],
+                data_points=[dp.model_dump() for dp in result.get("data_points", [])],
                 calculations=result.get("calculations", []),
                 sources=result.get("sources", []),
                 confidence=result.get("confidence", 0.0),
@@ -94,7 +94,7 @@ async def analyze_financial_query(request: QueryRequest):
             
             return QueryResponse(
                 answer=answer,
-                data_points=[dp.dict() for dp in data_points],
+                data_points=[dp.model_dump() for dp in data_points],
                 calculations=[],
                 sources=[],
                 confidence=0.7 if data_points else 0.3,
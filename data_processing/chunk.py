@@ -0,0 +1,9 @@
+from dataclasses import dataclass, field
+from typing import Dict, Any
+
+@dataclass(slots=True)
+class Chunk:
+    """A chunk ready for embedding: its text, flat metadata and any extracted metrics"""
+    content: str
+    metadata: Dict[str, Any]
+    extracted_metrics: Dict[str, Any] = field(default_factory=dict)
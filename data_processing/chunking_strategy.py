@@ -1,13 +1,14 @@
 from typing import List, Dict, Any
 import re
 from models.schemas import DocumentMetadata
+from data_processing.chunk import Chunk
 
 class FinancialChunkingStrategy:
     def __init__(self, max_chunk_size: int = 1000, overlap: int = 200):
         self.max_chunk_size = max_chunk_size
         self.overlap = overlap
     
-    def create_section_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def create_section_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Chunk]:
         """Create intelligent chunks - NOW WITH SEMANTIC SUPPORT"""
         
         # Try semantic chunking first, fallback to basic if needed
@@ -19,7 +20,7 @@ class FinancialChunkingStrategy:
             print(f"  Semantic chunking failed, using basic: {e}")
             return self._create_basic_chunks(parsed_docs)
     
-    def _create_basic_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _create_basic_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Chunk]:
         """Fallback basic chunking strategy"""
         chunks = []
         
@@ -40,20 +41,14 @@ class FinancialChunkingStrategy:
                             "sub_section": f"{section_name}_{i}",
                             "chunk_id": f"{metadata['chunk_id']}_{section_name}_{i}"
                         }
-                        chunks.append({
-                            "content": sub_chunk,
-                            "metadata": chunk_metadata
-                        })
+                        chunks.append(Chunk(content=sub_chunk, metadata=chunk_metadata))
                 else:
                     chunk_metadata = {
                         **metadata,
                         "section_type": section_name,
                         "chunk_id": f"{metadata['chunk_id']}_{section_name}"
                     }
-                    chunks.append({
-                        "content": section_text,
-                        "metadata": chunk_metadata
-                    })
+                    chunks.append(Chunk(content=section_text, metadata=chunk_metadata))
         
         return chunks
     
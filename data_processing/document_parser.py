@@ -1,15 +1,33 @@
-import PyPDF2
+import fitz
 import pdfplumber
 import re
-from typing import List, Dict, Any, Optional
+import os
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import json
 from models.schemas import DocumentMetadata, DocumentType, Quarter
 from config.settings import settings
-from data_processing.table_metrics import TableMetricsExtractor
+from data_processing.table_metrics import TableMetricsExtractor, strip_non_numeric
+
+# Per-section/per-match detail goes here; per-file progress stays on stdout
+logger = logging.getLogger(__name__)
+
+# Parsed chunks are deterministic per file version, so they are cached on
+# disk keyed by (path, mtime, size) and reused across runs
+PARSE_CACHE_DIR = ".fab_parse_cache"
+# Part of the cache key: bump whenever parsing or the chunk layout changes so
+# files cached by an older parser are re-parsed
+PARSER_CACHE_VERSION = 2
+# Metadata fields stored as their enum value in the cache, restored on load so
+# a cache hit matches a fresh parse
+CACHED_ENUM_FIELDS = {"quarter": Quarter, "document_type": DocumentType}
 
 class FABDocumentParser:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = PARSE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        
         self.metric_patterns = {
             "net_profit": [
                 r"net profit.*?(\d[\d,.]*\s*(?:million|billion|bn|mn|AED)?)",
@@ -46,6 +64,29 @@ class FABDocumentParser:
             ]
         }
         
+        # Compiled once. Deliberately Unicode (no re.ASCII): PDF text extraction
+        # emits non-breaking spaces between figures and units, which \s must match
+        self.compiled_metric_patterns = {
+            metric_name: [re.compile(p, re.IGNORECASE | re.MULTILINE | re.DOTALL) for p in patterns]
+            for metric_name, patterns in self.metric_patterns.items()
+        }
+        
+        # Single-pass extraction: every number in a section, plus the keywords
+        # that attribute a number to a metric when they appear just before it
+        self.number_pattern = re.compile(
+            r"\d[\d,]*(?:\.\d+)?(?:\s*(?:million|billion|bn|mn|AED|'000|M)\b)?",
+            re.IGNORECASE
+        )
+        self.metric_keywords = {
+            "net_profit": ["net profit", "profit after tax", "profit for the period", "profit for the year"],
+            "total_assets": ["total assets"],
+            "total_loans": ["loans and advances", "total loans"],
+            "total_deposits": ["customer deposits", "total deposits", "deposits"],
+            "shareholder_equity": ["shareholders' equity", "shareholder equity", "total equity", "equity"],
+            "net_interest_income": ["net interest income"]
+        }
+        self.keyword_lookback = 120
+        
         # Content type patterns for better chunk classification
         self.content_type_patterns = {
             "financial_data": [
@@ -125,6 +166,11 @@ class FABDocumentParser:
 
     def parse_financial_statement(self, file_path: str) -> List[Dict[str, Any]]:
         """Parse financial statement PDF - ENHANCED TO STORE BOTH METRICS AND TEXT"""
+        cached_chunks = self._load_cached_chunks(file_path)
+        if cached_chunks is not None:
+            print(f" Using cached parse for {file_path}: {len(cached_chunks)} chunks")
+            return cached_chunks
+        
         chunks = []
         metadata = self.extract_metadata_from_filename(Path(file_path).name)
         
@@ -140,13 +186,13 @@ class FABDocumentParser:
         try:
             # STEP 1: Extract ALL text content with enhanced section detection
             print("    Enhanced text extraction with content classification...")
-            text_chunks = self._extract_enhanced_text_content(file_path, metadata)
+            text_chunks, text_complete = self._extract_enhanced_text_content(file_path, metadata)
             print(f"    Created {len(text_chunks)} text chunks with content classification")
             chunks.extend(text_chunks)
             
             # STEP 2: Extract tables with metrics
             print("    Table extraction with metric preservation...")
-            table_chunks = self._extract_tables_with_metrics(file_path, metadata)
+            table_chunks, tables_complete = self._extract_tables_with_metrics(file_path, metadata)
             print(f"    Created {len(table_chunks)} table chunks with metrics")
             chunks.extend(table_chunks)
             
@@ -156,6 +202,10 @@ class FABDocumentParser:
                 if fallback_chunk:
                     chunks.append(fallback_chunk)
                     print(f"    Created fallback chunk")
+            # Only cache parses where both extractors finished and produced real
+            # chunks; partial or fallback results are retried next run
+            elif text_complete and tables_complete:
+                self._save_cached_chunks(file_path, chunks)
             
         except Exception as e:
             print(f" Error parsing {file_path}: {str(e)}")
@@ -168,14 +218,68 @@ class FABDocumentParser:
         print(f"    Final chunks: {len(chunks)}")
         return chunks
 
-    def _extract_enhanced_text_content(self, file_path: str, metadata: DocumentMetadata) -> List[Dict[str, Any]]:
-        """Extract text content with enhanced classification and metric preservation"""
+    def _parse_cache_path(self, file_path: str) -> Optional[Path]:
+        """Cache file for the current version of file_path, or None if caching is off"""
+        if not self.cache_dir:
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = f"{PARSER_CACHE_VERSION}|{os.path.abspath(file_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+        return self.cache_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load_cached_chunks(self, file_path: str) -> Optional[List[Dict[str, Any]]]:
+        """Load previously parsed chunks for an unchanged file"""
+        cache_path = self._parse_cache_path(file_path)
+        if not cache_path or not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            for chunk in chunks:
+                chunk_metadata = chunk["metadata"]
+                for field, enum_type in CACHED_ENUM_FIELDS.items():
+                    if field in chunk_metadata:
+                        chunk_metadata[field] = enum_type(chunk_metadata[field])
+            return chunks
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"     Ignoring unreadable parse cache {cache_path}: {e}")
+            return None
+
+    def _save_cached_chunks(self, file_path: str, chunks: List[Dict[str, Any]]):
+        """Persist parsed chunks as JSON, writing atomically
+        
+        Chunks hold only dicts, lists, str, numbers, bools and None, plus the str
+        enums in CACHED_ENUM_FIELDS (written as their values, restored on load).
+        Tuples would be written silently and read back as lists, so the parser
+        must not put them in chunks. Other types make json.dump raise, and then
+        the file is not cached.
+        """
+        cache_path = self._parse_cache_path(file_path)
+        if not cache_path or not chunks:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(chunks, f)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"     Could not write parse cache for {file_path}: {e}")
+
+    def _extract_enhanced_text_content(self, file_path: str, metadata: DocumentMetadata) -> Tuple[List[Dict[str, Any]], bool]:
+        """Extract text content with enhanced classification and metric preservation
+        
+        Returns (chunks, complete); complete is False when extraction stopped on an error.
+        """
         text_chunks = []
         
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
+            # PyMuPDF maps the file and loads pages on demand, so large
+            # annual reports are never buffered into memory in full
+            with fitz.open(file_path) as doc:
+                total_pages = doc.page_count
                 
                 print(f"    Extracting text from {total_pages} pages...")
                 
@@ -184,8 +288,8 @@ class FABDocumentParser:
                 section_content = ""
                 
                 for page_num in range(total_pages):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
+                    page = doc.load_page(page_num)
+                    text = page.get_text("text")
                     
                     if not text or not text.strip():
                         continue
@@ -210,7 +314,7 @@ class FABDocumentParser:
                                 page_num
                             )
                             text_chunks.append(chunk)
-                            print(f"       Section '{current_section}' ({current_content_type}): {len(metrics)} metrics, {len(section_content)} chars")
+                            logger.debug("Section '%s' (%s): %d metrics, %d chars", current_section, current_content_type, len(metrics), len(section_content))
                         
                         section_content = ""
                         current_section = new_section
@@ -230,46 +334,74 @@ class FABDocumentParser:
                         total_pages
                     )
                     text_chunks.append(chunk)
-                    print(f"       Final section '{current_section}' ({current_content_type}): {len(metrics)} metrics")
+                    logger.debug("Final section '%s' (%s): %d metrics", current_section, current_content_type, len(metrics))
                 
         except Exception as e:
             print(f"     Enhanced text extraction failed: {str(e)}")
+            return text_chunks, False
         
-        return text_chunks
+        return text_chunks, True
     def _extract_metrics_from_text_with_context(self, text: str, page_num: int, metadata: DocumentMetadata) -> Dict[str, Any]:
-        """Extract financial metrics with better context awareness"""
+        """Extract financial metrics with better context awareness
+        
+        Scans the text once for numbers and attributes each one to the metric
+        whose keyword appears closest before it, instead of running every
+        metric pattern over the whole section.
+        """
         metrics = {}
         
-        for metric_name, patterns in self.metric_patterns.items():
-            for pattern in patterns:
-                try:
-                    matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-                    for match in matches:
-                        value_str = match.group(1)
-                        numeric_value = self._convert_to_numeric(value_str)
-                        
-                        if numeric_value and numeric_value > 0:
-                            # Get context around the match for better validation
-                            context_start = max(0, match.start() - 100)
-                            context_end = min(len(text), match.end() + 100)
-                            context = text[context_start:context_end]
-                            
-                            # Check if this looks like a valid financial value in context
-                            if self._is_valid_financial_context(context, metric_name, numeric_value):
-                                metrics[metric_name] = {
-                                    "value": numeric_value,
-                                    "raw_text": match.group(0),
-                                    "page": page_num,
-                                    "context": context.replace('\n', ' ')[:200],  # Truncated context
-                                    "confidence": 0.8
-                                }
-                                print(f"       Extracted {metric_name}: {numeric_value:,.0f} from context")
-                                break  # Use first valid match
-                except Exception as e:
-                    continue
+        for match in self.number_pattern.finditer(text):
+            if len(metrics) == len(self.metric_keywords):
+                break  # Every metric already found
+            
+            window_start = max(0, match.start() - self.keyword_lookback)
+            closest = self._find_closest_metric_keyword(text[window_start:match.start()].lower())
+            if not closest:
+                continue
+            
+            metric_name, keyword_offset = closest
+            if metric_name in metrics:
+                continue  # Use first valid match
+            
+            numeric_value = self._convert_to_numeric(match.group(0))
+            
+            if numeric_value and numeric_value > 0:
+                # Get context around the match for better validation
+                context_start = max(0, match.start() - 100)
+                context_end = min(len(text), match.end() + 100)
+                context = text[context_start:context_end]
+                
+                # Check if this looks like a valid financial value in context
+                if self._is_valid_financial_context(context, metric_name, numeric_value):
+                    metrics[metric_name] = {
+                        "value": numeric_value,
+                        "raw_text": text[window_start + keyword_offset:match.end()],
+                        "page": page_num,
+                        "context": context.replace('\n', ' ')[:200],  # Truncated context
+                        "confidence": 0.8
+                    }
+                    logger.debug("Extracted %s: %.0f from context", metric_name, numeric_value)
         
         return metrics
 
+    def _find_closest_metric_keyword(self, window: str) -> Optional[tuple]:
+        """Return (metric_name, offset) of the metric keyword ending closest to the end of window"""
+        best = None
+        best_rank = None
+        
+        for metric_name, keywords in self.metric_keywords.items():
+            for keyword in keywords:
+                pos = window.rfind(keyword)
+                if pos == -1:
+                    continue
+                # Closest keyword wins; on a tie prefer the longer, more specific one
+                rank = (pos + len(keyword), len(keyword))
+                if best_rank is None or rank > best_rank:
+                    best_rank = rank
+                    best = (metric_name, pos)
+        
+        return best
+
     def _is_valid_financial_context(self, context: str, metric_name: str, value: float) -> bool:
         """Check if the context suggests this is a valid financial value"""
         context_lower = context.lower()
@@ -291,8 +423,11 @@ class FABDocumentParser:
             return False
             
         return True
-    def _extract_tables_with_metrics(self, file_path: str, metadata: DocumentMetadata) -> List[Dict[str, Any]]:
-        """Extract tables and preserve both table content AND metrics"""
+    def _extract_tables_with_metrics(self, file_path: str, metadata: DocumentMetadata) -> Tuple[List[Dict[str, Any]], bool]:
+        """Extract tables and preserve both table content AND metrics
+        
+        Returns (chunks, complete); complete is False when extraction stopped on an error.
+        """
         table_chunks = []
         
         try:
@@ -314,7 +449,7 @@ class FABDocumentParser:
                             chunk = {
                                 "content": table_text,
                                 "metadata": {
-                                    **metadata.dict(),
+                                    **metadata.model_dump(),
                                     "page_number": page_num + 1,
                                     "section_type": "table",
                                     "content_type": content_type,
@@ -328,14 +463,15 @@ class FABDocumentParser:
                             table_chunks.append(chunk)
                             
                             if extracted_metrics:
-                                print(f"       Table {table_num + 1} ({content_type}): {len(extracted_metrics)} metrics")
+                                logger.debug("Table %d (%s): %d metrics", table_num + 1, content_type, len(extracted_metrics))
             
             print(f"       Processed {len(table_chunks)} tables with metrics")
                             
         except Exception as e:
             print(f"        Table extraction failed: {e}")
+            return table_chunks, False
         
-        return table_chunks
+        return table_chunks, True
 
     def _create_enhanced_chunk(self, content: str, section_type: str, content_type: str,
                              metrics: Dict, metadata: DocumentMetadata, page_num: int) -> Dict[str, Any]:
@@ -343,7 +479,7 @@ class FABDocumentParser:
         return {
             "content": content,
             "metadata": {
-                **metadata.dict(),
+                **metadata.model_dump(),
                 "page_number": page_num,
                 "section_type": section_type,
                 "content_type": content_type,
@@ -359,29 +495,39 @@ class FABDocumentParser:
         """Identify the type of content for better retrieval"""
         text_lower = text.lower()
         
+        # Patterns are plain lowercase phrases, so a substring test suffices
         for content_type, patterns in self.content_type_patterns.items():
             for pattern in patterns:
-                if re.search(pattern, text_lower, re.IGNORECASE):
+                if pattern in text_lower:
                     return content_type
         
         return "other"
 
     def _classify_table_content(self, table_data: List[List[str]]) -> str:
-        """Classify table content type"""
+        """Classify table content type from the first cell naming a known section"""
         if not table_data:
             return "other"
         
-        # Combine all table text for analysis
-        all_text = " ".join([str(cell) for row in table_data for cell in row if cell])
-        all_text_lower = all_text.lower()
-        
-        for content_type, patterns in self.content_type_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, all_text_lower, re.IGNORECASE):
-                    return content_type
+        # Scan cells in reading order so header matches return without
+        # touching the rest of the table; patterns are plain phrases
+        for row in table_data:
+            for cell in row:
+                if not cell:
+                    continue
+                cell_lower = self._cell_text(cell).lower()
+                for content_type, patterns in self.content_type_patterns.items():
+                    for pattern in patterns:
+                        if pattern in cell_lower:
+                            return content_type
         
         return "financial_data"  # Default for financial tables
 
+    def _cell_text(self, cell) -> str:
+        """Render a table cell, skipping str() for cells that are already text"""
+        if isinstance(cell, str):
+            return cell
+        return str(cell) if cell else ""
+
     def _table_to_readable_text(self, table_data: List[List[str]]) -> str:
         """Convert table data to readable text format"""
         if not table_data:
@@ -391,14 +537,12 @@ class FABDocumentParser:
         text_parts.append("=" * 40)
         
         # Add headers
-        headers = [str(cell) if cell else "" for cell in table_data[0]]
-        text_parts.append(" | ".join(headers))
+        text_parts.append(" | ".join([self._cell_text(cell) for cell in table_data[0]]))
         text_parts.append("-" * 30)
         
         # Add data rows
         for row in table_data[1:]:
-            row_cells = [str(cell) if cell else "" for cell in row]
-            text_parts.append(" | ".join(row_cells))
+            text_parts.append(" | ".join([self._cell_text(cell) for cell in row]))
         
         return "\n".join(text_parts)
 
@@ -434,11 +578,10 @@ class FABDocumentParser:
         """Extract financial metrics from text using enhanced patterns"""
         metrics = {}
         
-        for metric_name, patterns in self.metric_patterns.items():
+        for metric_name, patterns in self.compiled_metric_patterns.items():
             for pattern in patterns:
                 try:
-                    matches = re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-                    for match in matches:
+                    for match in pattern.finditer(text):
                         value_str = match.group(1)
                         numeric_value = self._convert_to_numeric(value_str)
                         
@@ -453,13 +596,16 @@ class FABDocumentParser:
                                 break
                 except Exception as e:
                     continue
+                
+                if metric_name in metrics:
+                    break
         
         return metrics
 
     def _convert_to_numeric(self, value_str: str) -> Optional[float]:
         """Convert string financial values to numeric"""
         try:
-            cleaned = re.sub(r'[^\d.]', '', value_str)
+            cleaned = strip_non_numeric(value_str)
             if cleaned:
                 value = float(cleaned)
                 if 'billion' in value_str.lower() or 'bn' in value_str.lower():
@@ -541,15 +687,13 @@ class FABDocumentParser:
     def _create_fallback_chunk(self, file_path: str, metadata: DocumentMetadata) -> Optional[Dict[str, Any]]:
         """Create a fallback chunk when no content is extracted"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                first_page = pdf_reader.pages[0]
-                raw_text = first_page.extract_text() or "No text content available"
+            with fitz.open(file_path) as doc:
+                raw_text = doc.load_page(0).get_text("text") or "No text content available"
                 
                 return {
                     "content": f"Document: {metadata.document_type.value} {metadata.year} {metadata.quarter.value}\nContent: {raw_text[:500]}...",
                     "metadata": {
-                        **metadata.dict(),
+                        **metadata.model_dump(),
                         "page_number": 1,
                         "section_type": "fallback",
                         "content_type": "other",
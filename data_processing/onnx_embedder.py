@@ -0,0 +1,67 @@
+import os
+from typing import List, Optional
+import numpy as np
+
+# Optional int8 ONNX Runtime backend for CPU embedding
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# Directory holding the quantized export, created once with:
+#   optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 minilm-onnx
+#   optimum-cli onnxruntime quantize --onnx_model minilm-onnx --avx512_vnni -o minilm-onnx-int8
+ONNX_MODEL_DIR = os.getenv("FAB_ONNX_MODEL_DIR", "./minilm-onnx-int8")
+
+class OnnxMiniLMEncoder:
+    """int8 ONNX Runtime MiniLM exposing the SentenceTransformer.encode() subset we use"""
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, max_length: int = 256):
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        """Mean-pooled sentence embeddings, matching all-MiniLM-L6-v2's pooling"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            hidden = np.asarray(self.model(**inputs).last_hidden_state, dtype=np.float32)
+
+            # Average token vectors, ignoring padding
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled)
+
+        if not batches:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        embeddings = np.concatenate(batches)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+def load_onnx_encoder(model_dir: str = ONNX_MODEL_DIR) -> Optional[OnnxMiniLMEncoder]:
+    """Return the ONNX encoder when optimum is installed and the export exists, else None"""
+    if not ONNX_AVAILABLE or not os.path.isdir(model_dir):
+        return None
+    try:
+        return OnnxMiniLMEncoder(model_dir)
+    except Exception as e:
+        print(f" ONNX embedding model unavailable, using SentenceTransformer: {e}")
+        return None
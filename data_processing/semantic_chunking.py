@@ -1,11 +1,42 @@
 from typing import List, Dict, Any, Optional
 import re
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from data_processing.chunk import Chunk
+from data_processing.table_metrics import TableMetricsExtractor, build_keyword_matcher, match_keyword_names
+
+# Hot-path regexes compiled once at import instead of per line/cell
+_SENT_END_RE = re.compile(r'[.!?]+')
+
+# Body of every metric chunk, filled with one str.format call
+_METRIC_CHUNK_TEMPLATE = """
+KEY FINANCIAL METRIC EXTRACTION:
+
+Metric: {metric}
+Value: {value:,.0f} million AED
+Period: {period}
+Source: {source}
+Document: {document_type}
+
+This metric was extracted from the official financial statements and represents a key performance indicator for analysis.
+"""
+
+# Tables with more cells than this are embedded as key-value lines, not markdown
+KV_TABLE_CELL_THRESHOLD = 20
+
+# Below this many documents the process pool start-up costs more than it saves
+PARALLEL_MIN_DOCS = 8
 
 class SemanticFinancialChunking:
-    def __init__(self, max_chunk_size: int = 1000, overlap: int = 200):
+    def __init__(self, max_chunk_size: int = 1000, overlap: int = 200,
+                 metrics_extractor: Optional[TableMetricsExtractor] = None, parallel: bool = True):
         self.max_chunk_size = max_chunk_size
         self.overlap = overlap
+        # Off when the caller already runs one chunker per worker process
+        self.parallel = parallel
+        # Shared with the document parser so tables are only mined for metrics one way
+        self.metrics_extractor = metrics_extractor or TableMetricsExtractor()
         
         # Financial section patterns for FAB documents
         self.section_patterns = {
@@ -45,8 +76,30 @@ class SemanticFinancialChunking:
                 r"significant accounting"
             ]
         }
+        
+        # Table classification keywords, checked in priority order
+        self._table_header_matcher = build_keyword_matcher({
+            "income_statement": ["revenue", "income", "profit", "expense"],
+            "balance_sheet": ["assets", "liabilities", "equity"],
+            "cash_flow": ["cash flow", "operating", "investing"]
+        }, re.IGNORECASE)
+        self._table_text_matcher = build_keyword_matcher({
+            "income_statement": ["income statement", "profit and loss"],
+            "balance_sheet": ["balance sheet", "financial position"],
+            "cash_flow": ["cash flow"]
+        }, re.IGNORECASE)
+        
+        # All section patterns fused into one alternation; the named group
+        # that matched (m.lastgroup) identifies the section
+        self._section_regex = re.compile(
+            "|".join(
+                f"(?P<{section_name}>{'|'.join(patterns)})"
+                for section_name, patterns in self.section_patterns.items()
+            ),
+            re.IGNORECASE
+        )
     
-    def create_semantic_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def create_semantic_chunks(self, parsed_docs: List[Dict[str, Any]]) -> List[Chunk]:
         """Create intelligent chunks that preserve financial context - ENHANCED LOGGING"""
         all_chunks = []
         
@@ -54,28 +107,19 @@ class SemanticFinancialChunking:
         text_chunk_count = 0
         metric_chunk_count = 0
         
-        for doc_idx, doc in enumerate(parsed_docs):
-            content = doc["content"]
-            metadata = doc["metadata"]
-            
+        for doc_idx, (table_chunks, section_chunks, metric_chunks) in enumerate(self._process_docs(parsed_docs)):
             print(f"    Processing document {doc_idx + 1}...")
             
-            # 1. Extract and preserve complete tables
-            if doc.get("tables"):
-                table_chunks = self._chunk_complete_tables(doc["tables"], metadata)
+            if table_chunks:
                 all_chunks.extend(table_chunks)
                 table_chunk_count += len(table_chunks)
                 print(f"       Created {len(table_chunks)} table chunks")
             
-            # 2. Section-based chunks with hierarchy
-            section_chunks = self._chunk_financial_sections(content, metadata)
             all_chunks.extend(section_chunks)
             text_chunk_count += len(section_chunks)
             print(f"       Created {len(section_chunks)} text section chunks")
             
-            # 3. Metric-focused chunks for key financials
-            if doc.get("extracted_metrics"):
-                metric_chunks = self._chunk_key_metrics(doc["extracted_metrics"], metadata)
+            if metric_chunks:
                 all_chunks.extend(metric_chunks)
                 metric_chunk_count += len(metric_chunks)
                 print(f"       Created {len(metric_chunks)} metric chunks")
@@ -84,7 +128,36 @@ class SemanticFinancialChunking:
         print(f" Created {len(all_chunks)} total semantic chunks")
         return all_chunks
     
-    def _chunk_complete_tables(self, tables: List[Dict], metadata: Dict) -> List[Dict[str, Any]]:
+    def _process_docs(self, parsed_docs: List[Dict[str, Any]]) -> List[tuple]:
+        """Chunk documents independently, across CPU cores when there are enough of them"""
+        workers = min(os.cpu_count() or 1, len(parsed_docs))
+        if self.parallel and len(parsed_docs) >= PARALLEL_MIN_DOCS and workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    chunksize = max(1, len(parsed_docs) // (workers * 4))
+                    return list(executor.map(self._process_doc, parsed_docs, chunksize=chunksize))
+            except Exception as e:
+                print(f"    Parallel chunking unavailable, running sequentially: {e}")
+        
+        return [self._process_doc(doc) for doc in parsed_docs]
+    
+    def _process_doc(self, doc: Dict[str, Any]) -> tuple:
+        """Build the (table, section, metric) chunks for one parsed document"""
+        content = doc["content"]
+        metadata = doc["metadata"]
+        
+        # 1. Extract and preserve complete tables
+        table_chunks = self._chunk_complete_tables(doc["tables"], metadata) if doc.get("tables") else []
+        
+        # 2. Section-based chunks with hierarchy
+        section_chunks = self._chunk_financial_sections(content, metadata)
+        
+        # 3. Metric-focused chunks for key financials
+        metric_chunks = self._chunk_key_metrics(doc["extracted_metrics"], metadata) if doc.get("extracted_metrics") else []
+        
+        return table_chunks, section_chunks, metric_chunks
+    
+    def _chunk_complete_tables(self, tables: List[Dict], metadata: Dict) -> List[Chunk]:
         """Keep financial tables intact as single chunks"""
         table_chunks = []
         
@@ -92,18 +165,23 @@ class SemanticFinancialChunking:
             table_data = table.get("data", [])
             table_text = table.get("text", "")
             
-            # Convert table to readable format
-            formatted_table = self._table_to_markdown(table_data)
+            # Convert table to readable format; large tables use the compact key-value form
+            if table_data and len(table_data) * len(table_data[0]) > KV_TABLE_CELL_THRESHOLD:
+                formatted_table = self._table_to_kv(table_data)
+            else:
+                formatted_table = self._table_to_markdown(table_data)
             
             # Determine table type
             table_type = self._classify_table_type(table_data, table_text)
             
-            # Extract metrics from this table
-            extracted_metrics = self._extract_metrics_from_table_data(table_data, table_type)
+            # Reuse metrics the parser already pulled from this table, else extract them once
+            extracted_metrics = table.get("extracted_metrics")
+            if extracted_metrics is None:
+                extracted_metrics = self.metrics_extractor.extract_metrics_from_table_data(table_data, table_type)
             
-            chunk = {
-                "content": f"## FINANCIAL TABLE: {table_type.replace('_', ' ').title()}\n\n{formatted_table}",
-                "metadata": {
+            chunk = Chunk(
+                content=f"## FINANCIAL TABLE: {table_type.replace('_', ' ').title()}\n\n{formatted_table}",
+                metadata={
                     **metadata,
                     "chunk_type": "financial_table",
                     "table_type": table_type,
@@ -112,13 +190,13 @@ class SemanticFinancialChunking:
                     "chunk_id": f"{metadata.get('chunk_id', 'unknown')}_table_{i+1}",
                     "extracted_metrics": list(extracted_metrics.keys())
                 },
-                "extracted_metrics": extracted_metrics
-            }
+                extracted_metrics=extracted_metrics
+            )
             table_chunks.append(chunk)
         
         return table_chunks
     
-    def _chunk_financial_sections(self, content: str, metadata: Dict) -> List[Dict[str, Any]]:
+    def _chunk_financial_sections(self, content: str, metadata: Dict) -> List[Chunk]:
         """Create section-based chunks with hierarchy preservation"""
         sections = self._split_into_semantic_sections(content)
         chunks = []
@@ -132,9 +210,9 @@ class SemanticFinancialChunking:
             if len(section_content) > self.max_chunk_size:
                 sub_chunks = self._split_section_intelligently(section_content, section_name)
                 for i, sub_chunk in enumerate(sub_chunks):
-                    chunk = {
-                        "content": sub_chunk,
-                        "metadata": {
+                    chunk = Chunk(
+                        content=sub_chunk,
+                        metadata={
                             **metadata,
                             "chunk_type": "text_section",
                             "section_type": section_name,
@@ -142,28 +220,33 @@ class SemanticFinancialChunking:
                             "chunk_id": f"{metadata.get('chunk_id', 'unknown')}_{section_name}_{i+1}",
                             "hierarchy_level": self._get_hierarchy_level(section_name)
                         }
-                    }
+                    )
                     chunks.append(chunk)
             else:
                 # Small section - keep as single chunk
-                chunk = {
-                    "content": section_content,
-                    "metadata": {
+                chunk = Chunk(
+                    content=section_content,
+                    metadata={
                         **metadata,
                         "chunk_type": "text_section", 
                         "section_type": section_name,
                         "chunk_id": f"{metadata.get('chunk_id', 'unknown')}_{section_name}",
                         "hierarchy_level": self._get_hierarchy_level(section_name)
                     }
-                }
+                )
                 chunks.append(chunk)
         
         return chunks
     
-    def _chunk_key_metrics(self, extracted_metrics: Dict, metadata: Dict) -> List[Dict[str, Any]]:
+    def _chunk_key_metrics(self, extracted_metrics: Dict, metadata: Dict) -> List[Chunk]:
         """Create dedicated chunks for important financial metrics"""
         metric_chunks = []
         
+        # Document-level fields are the same for every metric chunk
+        period = f"{metadata.get('year', '')} {metadata.get('quarter', '')}"
+        document_type = metadata.get('document_type', 'financial_statement')
+        chunk_id_prefix = metadata.get('chunk_id', 'unknown')
+        
         for metric_name, metric_info in extracted_metrics.items():
             value = metric_info.get("value", 0)
             source = metric_info.get("source", "unknown")
@@ -171,30 +254,37 @@ class SemanticFinancialChunking:
             
             # Only create chunks for high-confidence metrics
             if confidence > 0.6:
-                chunk_content = self._create_metric_chunk_content(metric_name, value, source, metadata)
+                chunk_content = _METRIC_CHUNK_TEMPLATE.format(
+                    metric=metric_name.replace('_', ' ').title(),
+                    value=value,
+                    period=period,
+                    source=source,
+                    document_type=document_type
+                )
                 
-                chunk = {
-                    "content": chunk_content,
-                    "metadata": {
+                chunk = Chunk(
+                    content=chunk_content,
+                    metadata={
                         **metadata,
                         "chunk_type": "financial_metric",
                         "metric_name": metric_name,
                         "metric_value": value,
                         "metric_source": source,
                         "metric_confidence": confidence,
-                        "chunk_id": f"{metadata.get('chunk_id', 'unknown')}_metric_{metric_name}",
+                        "chunk_id": f"{chunk_id_prefix}_metric_{metric_name}",
                         "section_type": "key_metrics"
                     }
-                }
+                )
                 metric_chunks.append(chunk)
         
         return metric_chunks
     
     def _split_into_semantic_sections(self, content: str) -> Dict[str, str]:
         """Split content into meaningful financial sections"""
-        sections = {}
-        current_section = "header"
-        sections[current_section] = ""
+        # Lines are collected per section and joined once at the end,
+        # avoiding repeated string concatenation on long documents
+        sections: Dict[str, List[str]] = {"header": []}
+        current_lines = sections["header"]
         
         lines = content.split('\n')
         
@@ -203,25 +293,16 @@ class SemanticFinancialChunking:
             if not line_stripped:
                 continue
                 
-            section_found = False
-            
             # Check if this line starts a new section
-            for section_name, patterns in self.section_patterns.items():
-                for pattern in patterns:
-                    if re.search(pattern, line_stripped, re.IGNORECASE):
-                        current_section = section_name
-                        sections[current_section] = line + "\n"
-                        section_found = True
-                        break
-                if section_found:
-                    break
+            match = self._section_regex.search(line_stripped)
+            if match:
+                current_lines = sections.setdefault(match.lastgroup, [])
             
-            if not section_found:
-                # Continue adding to current section
-                sections[current_section] += line + "\n"
+            current_lines.append(line)
         
         # Clean up sections - remove empty ones
-        return {k: v.strip() for k, v in sections.items() if v.strip()}
+        joined = {k: "\n".join(v).strip() for k, v in sections.items()}
+        return {k: v for k, v in joined.items() if v}
     
     def _split_section_intelligently(self, section_content: str, section_name: str) -> List[str]:
         """Split large sections while preserving financial context"""
@@ -250,26 +331,27 @@ class SemanticFinancialChunking:
         refined_chunks = []
         for chunk in chunks:
             if len(chunk) > self.max_chunk_size:
-                # Split by sentences for very large chunks
-                sentences = re.split(r'[.!?]+', chunk)
-                current_sentences = []
+                # Split at sentence ends for very large chunks, slicing the original text by offset
+                start = 0
+                current_start = 0
                 current_length = 0
                 
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence:
-                        continue
-                    
-                    if current_length + len(sentence) > self.max_chunk_size and current_sentences:
-                        refined_chunks.append('. '.join(current_sentences) + '.')
-                        current_sentences = [sentence]
-                        current_length = len(sentence)
-                    else:
-                        current_sentences.append(sentence)
-                        current_length += len(sentence)
+                for match in _SENT_END_RE.finditer(chunk):
+                    sentence_length = match.end() - start
+                    if current_length + sentence_length > self.max_chunk_size and current_length:
+                        refined_chunks.append(chunk[current_start:start].strip())
+                        current_start = start
+                        current_length = 0
+                    current_length += sentence_length
+                    start = match.end()
                 
-                if current_sentences:
-                    refined_chunks.append('. '.join(current_sentences) + '.')
+                # Flush the buffered sentences plus any unterminated tail
+                if current_length and len(chunk) - current_start > self.max_chunk_size:
+                    refined_chunks.append(chunk[current_start:start].strip())
+                    current_start = start
+                tail = chunk[current_start:].strip()
+                if tail:
+                    refined_chunks.append(tail)
             else:
                 refined_chunks.append(chunk)
         
@@ -280,95 +362,41 @@ class SemanticFinancialChunking:
         if not table_data or len(table_data) < 1:
             return "No table data available"
         
-        markdown_lines = []
-        
-        # Header row
-        headers = table_data[0]
-        markdown_lines.append("| " + " | ".join(str(h) if h else "" for h in headers) + " |")
-        markdown_lines.append("|" + "|".join(["---"] * len(headers)) + "|")
-        
-        # Data rows
-        for row in table_data[1:]:
-            markdown_lines.append("| " + " | ".join(str(cell) if cell else "" for cell in row) + " |")
+        # Render every row in one pass, then slot the separator under the header
+        markdown_lines = [
+            "| " + " | ".join([str(cell) if cell else "" for cell in row]) + " |"
+            for row in table_data
+        ]
+        markdown_lines.insert(1, "|" + "|".join(["---"] * len(table_data[0])) + "|")
         
         return "\n".join(markdown_lines)
     
+    def _table_to_kv(self, table_data: List[List[str]]) -> str:
+        """Convert table data to 'Header: Value; ...' lines (far fewer tokens than markdown)"""
+        if not table_data:
+            return "No table data available"
+        
+        headers = [str(h).strip() if h else f"Column {j + 1}" for j, h in enumerate(table_data[0])]
+        kv_lines = [
+            "; ".join([f"{h}: {str(c).strip()}" for h, c in zip(headers, row) if c and str(c).strip()])
+            for row in table_data[1:]
+        ]
+        return "\n".join([line for line in kv_lines if line])
+    
     def _classify_table_type(self, table_data: List[List[str]], table_text: str) -> str:
         """Classify the type of financial table"""
-        combined_text = table_text.lower()
-        
+        # Matchers are case-insensitive, so neither the headers nor the text are lowered
         # Check headers in first row
         if table_data and len(table_data) > 0:
-            header_row = " ".join([str(cell).lower() for cell in table_data[0] if cell])
+            header_row = " ".join([str(cell) for cell in table_data[0] if cell])
             
-            if any(keyword in header_row for keyword in ["revenue", "income", "profit", "expense"]):
-                return "income_statement"
-            elif any(keyword in header_row for keyword in ["assets", "liabilities", "equity"]):
-                return "balance_sheet"
-            elif any(keyword in header_row for keyword in ["cash flow", "operating", "investing"]):
-                return "cash_flow"
+            header_types = match_keyword_names(self._table_header_matcher, header_row)
+            if header_types:
+                return header_types[0]
         
         # Fallback to content analysis
-        if any(keyword in combined_text for keyword in ["income statement", "profit and loss"]):
-            return "income_statement"
-        elif any(keyword in combined_text for keyword in ["balance sheet", "financial position"]):
-            return "balance_sheet"
-        elif any(keyword in combined_text for keyword in ["cash flow"]):
-            return "cash_flow"
-        else:
-            return "financial_table"
-    
-    def _extract_metrics_from_table_data(self, table_data: List[List[str]], table_type: str) -> Dict[str, Any]:
-        """Extract key metrics from table data"""
-        metrics = {}
-        
-        if not table_data or len(table_data) < 2:
-            return metrics
-        
-        headers = [str(cell).lower() if cell else "" for cell in table_data[0]]
-        
-        # Map headers to metrics based on table type
-        header_to_metric = {
-            "income_statement": {
-                "net profit": "net_profit",
-                "profit for the period": "net_profit",
-                "total revenue": "total_revenue",
-                "total income": "total_income"
-            },
-            "balance_sheet": {
-                "total assets": "total_assets",
-                "total equity": "shareholder_equity", 
-                "shareholders equity": "shareholder_equity",
-                "total loans": "total_loans",
-                "customer deposits": "total_deposits"
-            }
-        }
-        
-        mapping = header_to_metric.get(table_type, {})
-        
-        for row in table_data[1:]:
-            for i, cell in enumerate(row):
-                if i >= len(headers):
-                    continue
-                    
-                cell_value = str(cell) if cell else ""
-                header = headers[i]
-                
-                # Look for numeric values
-                if re.search(r'\d[\d,.]*\s*(?:million|AED)', cell_value):
-                    numeric_value = self._convert_to_numeric(cell_value)
-                    if numeric_value:
-                        # Check if this header maps to a known metric
-                        for pattern, metric_name in mapping.items():
-                            if pattern in header:
-                                metrics[metric_name] = {
-                                    "value": numeric_value,
-                                    "source": f"table_{table_type}",
-                                    "confidence": 0.8
-                                }
-                                break
-        
-        return metrics
+        text_types = match_keyword_names(self._table_text_matcher, table_text)
+        return text_types[0] if text_types else "financial_table"
     
     def _get_hierarchy_level(self, section_name: str) -> int:
         """Determine hierarchy level for sections"""
@@ -381,32 +409,4 @@ class SemanticFinancialChunking:
             "risk_management": 2,
             "notes_accounting": 3
         }
-        return hierarchy_map.get(section_name, 2)
-    
-    def _create_metric_chunk_content(self, metric_name: str, value: float, source: str, metadata: Dict) -> str:
-        """Create content for metric-focused chunks"""
-        period = f"{metadata.get('year', '')} {metadata.get('quarter', '')}"
-        document_type = metadata.get('document_type', 'financial_statement')
-        
-        return f"""
-KEY FINANCIAL METRIC EXTRACTION:
-
-Metric: {metric_name.replace('_', ' ').title()}
-Value: {value:,.0f} million AED
-Period: {period}
-Source: {source}
-Document: {document_type}
-
-This metric was extracted from the official financial statements and represents a key performance indicator for analysis.
-"""
-    
-    def _convert_to_numeric(self, value_str: str) -> Optional[float]:
-        """Convert string to numeric value"""
-        try:
-            # Remove commas and non-numeric characters except decimal point
-            cleaned = re.sub(r'[^\d.]', '', value_str)
-            if cleaned:
-                return float(cleaned)
-        except ValueError:
-            pass
-        return None
\ No newline at end of file
+        return hierarchy_map.get(section_name, 2)
\ No newline at end of file
@@ -1,6 +1,39 @@
 import re
+import logging
 from typing import List, Dict, Any
 
+logger = logging.getLogger(__name__)
+
+# Per-cell regexes compiled once at import
+_NUMERIC_ONLY_RE = re.compile(r'^[\d,.\-()=]+$')
+_FIN_VALUE_RE = re.compile(r'^[\d,.\s]+$')
+
+class _NumericCharTable(dict):
+    """str.translate table keeping digits and '.', filled lazily per code point"""
+    def __missing__(self, code_point: int):
+        char = chr(code_point)
+        kept = code_point if char == '.' or char.isdecimal() else None
+        self[code_point] = kept
+        return kept
+
+_NUMERIC_CHARS = _NumericCharTable()
+
+def strip_non_numeric(text: str) -> str:
+    """Drop every character except digits and '.' (a C-level translate, no regex)"""
+    return text.translate(_NUMERIC_CHARS)
+
+def build_keyword_matcher(keyword_map: Dict[str, List[str]], flags: int = 0) -> re.Pattern:
+    """Fuse a {name: [keywords]} map into one regex whose named groups are the names"""
+    return re.compile("|".join(
+        f"(?P<{name}>{'|'.join(re.escape(keyword) for keyword in keywords)})"
+        for name, keywords in keyword_map.items()
+    ), flags)
+
+def match_keyword_names(matcher: re.Pattern, text: str) -> List[str]:
+    """Names whose keywords occur in text, in the map's original priority order"""
+    found = {match.lastgroup for match in matcher.finditer(text)}
+    return [name for name in matcher.groupindex if name in found]
+
 class TableMetricsExtractor:
     def __init__(self):
         self.metric_mapping = {
@@ -23,6 +56,9 @@ class TableMetricsExtractor:
                 "net interest income", "interest income net"
             ]
         }
+        
+        # Row descriptions are matched against every keyword in one scan
+        self._metric_matcher = build_keyword_matcher(self.metric_mapping)
     
     def extract_metrics_from_table_data(self, table_data: List[List[str]], table_type: str) -> Dict[str, Any]:
         """Extract metrics from table data"""
@@ -31,7 +67,7 @@ class TableMetricsExtractor:
         if not table_data or len(table_data) < 2:
             return metrics
         
-        print(f"       Analyzing table with {len(table_data)} rows, {len(table_data[0])} columns")
+        logger.debug("Analyzing table with %d rows, %d columns", len(table_data), len(table_data[0]))
         
         # Try to extract from structured financial tables
         for row_idx, row in enumerate(table_data):
@@ -50,29 +86,31 @@ class TableMetricsExtractor:
             if not row_description:
                 continue
             
-            # Look for numeric values in the row
-            for col_idx, cell in enumerate(row):
+            # Match row description to known metrics once per row
+            row_metrics = match_keyword_names(self._metric_matcher, row_description)
+            if not row_metrics:
+                continue
+            
+            # The rightmost numeric cell in the row wins, so scan from the right and stop there
+            for cell in reversed(row):
                 if cell and self._is_financial_value(cell):
                     numeric_value = self._convert_to_numeric(str(cell))
                     if numeric_value and numeric_value > 0:
-                        # Try to match row description to known metrics
-                        for metric_name, patterns in self.metric_mapping.items():
-                            for pattern in patterns:
-                                if pattern in row_description:
-                                    metrics[metric_name] = {
-                                        "value": numeric_value,
-                                        "source": f"table_{table_type}",
-                                        "row_description": row_description,
-                                        "confidence": 0.7
-                                    }
-                                    print(f"       Table extracted {metric_name}: {numeric_value:,.0f}")
-                                    break
+                        for metric_name in row_metrics:
+                            metrics[metric_name] = {
+                                "value": numeric_value,
+                                "source": f"table_{table_type}",
+                                "row_description": row_description,
+                                "confidence": 0.7
+                            }
+                            logger.debug("Table extracted %s: %.0f", metric_name, numeric_value)
+                        break
         
         return metrics
     
     def _is_numeric_only(self, text: str) -> bool:
         """Check if text contains only numbers and basic punctuation"""
-        return bool(re.match(r'^[\d,.\-()=]+$', text.strip()))
+        return bool(_NUMERIC_ONLY_RE.match(text.strip()))
     
     def _is_financial_value(self, cell) -> bool:
         """Check if cell contains a financial value"""
@@ -81,10 +119,16 @@ class TableMetricsExtractor:
         
         cell_str = str(cell).strip()
         
+        # Most cells are text labels: reject anything that cannot start a number
+        # before paying for the regex
+        first = cell_str[:1]
+        if not first or not (first.isdigit() or first in ',.'):
+            return False
+        
         # Look for patterns like "5,673", "5673", "5.673", etc.
-        if re.match(r'^[\d,.\s]+$', cell_str):
+        if _FIN_VALUE_RE.match(cell_str):
             # Remove commas and check if it's a reasonable number
-            cleaned = re.sub(r'[^\d.]', '', cell_str)
+            cleaned = strip_non_numeric(cell_str)
             if cleaned and '.' in cleaned:
                 # Has decimal, likely a financial value
                 return True
@@ -97,7 +141,7 @@ class TableMetricsExtractor:
         """Convert string to numeric value"""
         try:
             # Remove commas and non-numeric characters except decimal point
-            cleaned = re.sub(r'[^\d.]', '', value_str)
+            cleaned = strip_non_numeric(value_str)
             if cleaned:
                 value = float(cleaned)
                 
@@ -2,19 +2,251 @@ import chromadb
 from chromadb.config import Settings
 from typing import List, Dict, Any, Optional
 import uuid
+import os
+import sys
+import threading
+from collections import defaultdict
+from enum import Enum
+import numpy as np
 from sentence_transformers import SentenceTransformer
 from config.settings import settings
+from data_processing.onnx_embedder import load_onnx_encoder
+from data_processing.chunk import Chunk
+
+# Optional in-memory ANN index; Chroma remains the persistent store
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Metadata strings up to this length (document type, year, section...) repeat
+# across thousands of chunks, so they are interned to share one object each
+INTERN_MAX_LEN = 64
+# Values unique per chunk would only bloat the intern table
+UNIQUE_METADATA_KEYS = {"chunk_id"}
+
+# Chunks per bulk insert: each batch is one embedding pass and one Chroma
+# (SQLite) transaction, and a failing batch only costs a re-split of itself
+ADD_BATCH_SIZE = int(os.getenv("FAB_CHROMA_BATCH", "200"))
+
+# SQLite settings for a rebuild-from-scratch bulk load: no journal or fsync per
+# insert. Only safe when a crash mid-load means re-running the load.
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA locking_mode=EXCLUSIVE",
+)
+# Chroma's crash-safe defaults, restored once the load is done
+DURABLE_PRAGMAS = (
+    "PRAGMA locking_mode=NORMAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA journal_mode=WAL",
+)
+
+# One embedding model per process, loaded on first use and shared by every store
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+def get_embedding_model():
+    """Return the shared all-MiniLM-L6-v2 model, loading it once (thread-safe)
+    
+    Prefers the int8 ONNX Runtime export when it has been generated, since it
+    encodes several times faster on CPU; otherwise loads SentenceTransformer.
+    """
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                model = load_onnx_encoder()
+                if model is None:
+                    model = SentenceTransformer('all-MiniLM-L6-v2')
+                    # Half-precision weights halve model memory and bandwidth on GPU;
+                    # CPU kernels for fp16 are slow, so keep fp32 there
+                    if model.device.type == "cuda":
+                        model.half()
+                _MODEL = model
+    return _MODEL
+
+def intern_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Return metadata with its keys and short, low-cardinality string values interned"""
+    return {
+        sys.intern(key): (
+            # Exact str only: sys.intern rejects subclasses such as (str, Enum) members
+            sys.intern(value)
+            if type(value) is str and len(value) <= INTERN_MAX_LEN and key not in UNIQUE_METADATA_KEYS
+            else value
+        )
+        for key, value in metadata.items()
+    }
 
 class FinancialVectorStore:
+    # Chunks per SentenceTransformer forward pass when embedding documents
+    EMBED_BATCH_SIZE = 64
+    # HNSW graph degree
+    HNSW_M = 32
+    # HNSW candidate list size per search; fixed when the index is built since
+    # FAISS reads it unsynchronized, and above the largest n_results callers use
+    HNSW_EF_SEARCH = 128
+    
     def __init__(self):
+        # Bumped whenever stored documents change, so callers can invalidate cached results
+        self.data_version = 0
         self.client = chromadb.PersistentClient(path=settings.VECTOR_DB_PATH)
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = get_embedding_model()
         
        
         self.collection = self.client.get_or_create_collection(
             name=settings.COLLECTION_NAME,
             metadata={"description": "FAB Financial Documents"}
         )
+        
+        # FAISS indexes aren't safe to search while being built or appended to
+        self._index_lock = threading.RLock()
+        # The FAISS index is built on first search (see _ensure_index), so opening a
+        # store to write or delete never loads the corpus
+        self.drop_index()
+
+    def data_fingerprint(self) -> str:
+        """Identifies the stored data across processes: row count plus latest DB file mtime
+        
+        Unlike data_version this survives restarts, so caches persisted to disk
+        can tell that the database was re-ingested since they were written.
+        """
+        latest = 0
+        try:
+            with os.scandir(settings.VECTOR_DB_PATH) as entries:
+                for entry in entries:
+                    # SQLite's shared-memory index changes on reads as well
+                    if not entry.name.endswith("-shm"):
+                        latest = max(latest, entry.stat().st_mtime_ns)
+        except OSError:
+            pass
+        return f"{self.collection.count()}-{latest}"
+
+    def set_bulk_load_mode(self, enabled: bool) -> bool:
+        """Switch Chroma's SQLite connection to (or back from) unjournaled bulk-load settings
+        
+        Chroma pools one connection per thread and PRAGMAs apply per connection,
+        so this must run on the thread that performs the inserts.
+        
+        Uses Chroma's internal connection pool, so on client versions without it
+        this prints a warning, leaves the settings alone and returns False.
+        """
+        try:
+            system_db = getattr(self.client, "_sysdb", None) or self.client._server._sysdb
+            # The calling thread's pooled connection
+            conn = system_db._conn_pool.connect()
+            for pragma in (BULK_LOAD_PRAGMAS if enabled else DURABLE_PRAGMAS):
+                conn.execute(pragma)
+            print(f" SQLite bulk-load mode {'enabled' if enabled else 'disabled'}")
+            return True
+        except Exception as e:
+            print(f"  Could not change SQLite settings: {e}")
+            return False
+    
+    def drop_index(self):
+        """Discard the in-memory index; the next search rebuilds it from Chroma"""
+        with self._index_lock:
+            self.data_version += 1
+            self.index = None
+            self._index_documents = []
+            self._index_metadatas = []
+            # (metadata key, value) -> FAISS positions, so equality filters are set
+            # intersections instead of a scan over every row's metadata
+            self._inverted = defaultdict(set)
+    
+    def rebuild_index(self):
+        """Load every stored embedding from Chroma into an in-memory FAISS HNSW index"""
+        with self._index_lock:
+            self.drop_index()
+            
+            if not FAISS_AVAILABLE:
+                return
+            
+            stored = self.collection.get(include=["embeddings", "documents", "metadatas"])
+            dimension = self.embedding_model.get_sentence_embedding_dimension()
+            index = faiss.IndexHNSWFlat(dimension, self.HNSW_M)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = self.HNSW_EF_SEARCH
+            self.index = index
+            
+            if stored["ids"]:
+                self._add_to_index(stored["embeddings"], stored["documents"], stored["metadatas"])
+    
+    def _ensure_index(self) -> bool:
+        """Build the index on first use and rebuild it once Chroma's row count no longer matches
+        
+        A count mismatch means rows were written (or deleted) by another process
+        since the index was loaded. Returns False when searches must go to Chroma.
+        Caller holds _index_lock.
+        """
+        if not FAISS_AVAILABLE:
+            return False
+        if self.index is None or self.collection.count() != self.index.ntotal:
+            self.rebuild_index()
+        return self.index is not None and self.index.ntotal > 0
+    
+    def _add_to_index(self, embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Append vectors plus their payloads, keeping list positions aligned with FAISS ids"""
+        with self._index_lock:
+            # Not built yet: the first search loads these rows from Chroma
+            if self.index is None:
+                return
+            start = self.index.ntotal
+            self.index.add(np.asarray(embeddings, dtype="float32"))
+            self._index_documents.extend(documents)
+            # Metadata read back from Chroma is a fresh copy per row; intern it so the
+            # long-lived index shares one object per repeated key and value
+            for position, metadata in enumerate(metadatas, start):
+                metadata = intern_metadata(metadata)
+                self._index_metadatas.append(metadata)
+                for key, value in metadata.items():
+                    self._inverted[(key, value)].add(position)
+    
+    def _search_index(self, query_embeddings: List[List[float]], where_clause: Optional[Dict],
+                      n_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Search the in-memory index; equality filters go through the inverted index
+        
+        Returns None when the caller should fall back to Chroma: no index or
+        operator-style filters.
+        """
+        if where_clause and any(isinstance(v, (dict, list)) or k.startswith("$") for k, v in where_clause.items()):
+            return None
+        
+        query = np.asarray(query_embeddings, dtype="float32")
+        
+        with self._index_lock:
+            if not self._ensure_index():
+                return None
+            
+            if where_clause:
+                # Intersect posting sets smallest-first, then score only the survivors exactly
+                postings = sorted((self._inverted.get((k, v), set()) for k, v in where_clause.items()), key=len)
+                candidates = set.intersection(*postings)
+                if not candidates:
+                    return []
+                positions = np.fromiter(candidates, dtype="int64", count=len(candidates))
+                vectors = self.index.reconstruct_batch(positions)
+                distances = ((vectors - query) ** 2).sum(axis=1)
+                top = np.argsort(distances)[:n_results]
+                hits = zip(distances[top], positions[top])
+            else:
+                distances, positions = self.index.search(query, min(n_results, self.index.ntotal))
+                hits = zip(distances[0], positions[0])
+            
+            # Copies: the stored dicts back the inverted index and must not be mutated by callers
+            return [
+                {
+                    "content": self._index_documents[position],
+                    "metadata": dict(self._index_metadatas[position]),
+                    "distance": float(distance),
+                    "score": 1 - float(distance)
+                }
+                for distance, position in hits
+                if position >= 0
+            ]
 
     
 
@@ -25,6 +257,9 @@ class FinancialVectorStore:
         for key, value in metadata.items():
             if value is None:
                 cleaned[key] = ""
+            elif isinstance(value, Enum):
+                # Parser metadata comes from DocumentMetadata.model_dump(), which keeps Quarter/DocumentType members
+                cleaned[key] = value.value
             elif isinstance(value, list):
                 
                 if value:
@@ -37,9 +272,21 @@ class FinancialVectorStore:
                 # Convert any other type to string
                 cleaned[key] = str(value)
         
-        return cleaned
+        return intern_metadata(cleaned)
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts in large batches with the local embedding model"""
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=self.EMBED_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        # Chroma stores float32, so upcast fp16 output before handing it over
+        return embeddings.astype("float32").tolist()
         
-    def add_documents(self, chunks: List[Dict[str, Any]]):
+    def add_documents(self, chunks: List[Chunk]):
         """Add document chunks to vector store"""
         documents = []
         metadatas = []
@@ -47,23 +294,54 @@ class FinancialVectorStore:
         
         for chunk in chunks:
             doc_id = str(uuid.uuid4())
-            documents.append(chunk["content"])
+            documents.append(chunk.content)
             
             # CLEAN THE METADATA BEFORE ADDING
-            cleaned_metadata = self._clean_metadata(chunk["metadata"])
+            cleaned_metadata = self._clean_metadata(chunk.metadata)
             metadatas.append(cleaned_metadata)
             
             ids.append(doc_id)
         
+        # Pre-encode in batches rather than letting Chroma embed per call
+        embeddings = self._embed(documents)
         self.collection.add(
             documents=documents,
+            embeddings=embeddings,
             metadatas=metadatas,
             ids=ids
         )
+        self.data_version += 1
+        self._add_to_index(embeddings, documents, metadatas)
     
-    def search(self, query: str, filters: Optional[Dict] = None, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for relevant documents with filtering - FIXED VERSION"""
+    def add_documents_in_batches(self, chunks: List[Chunk], batch_size: int = ADD_BATCH_SIZE) -> List[Chunk]:
+        """Bulk insert in fixed-size batches, bisecting failed batches to isolate bad chunks
+        
+        Returns the chunks that were added.
+        """
+        added: List[Chunk] = []
         
+        def add(batch: List[Chunk]):
+            try:
+                self.add_documents(batch)
+                added.extend(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"    Skipping chunk: {e}")
+                    return
+                middle = len(batch) // 2
+                add(batch[:middle])
+                add(batch[middle:])
+        
+        for start in range(0, len(chunks), batch_size):
+            add(chunks[start:start + batch_size])
+        return added
+    
+    def search(self, query: str, filters: Optional[Dict] = None, n_results: int = 5,
+               query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search for relevant documents with filtering - FIXED VERSION
+        
+        query_embedding, when the caller already has it from self._embed, skips re-encoding query.
+        """
         
         where_clause = None
         if filters and any(filters.values()):
@@ -72,9 +350,16 @@ class FinancialVectorStore:
             if clean_filters:
                 where_clause = clean_filters
         
+        # Queries must use the same model as the stored document embeddings
+        query_embeddings = [query_embedding] if query_embedding is not None else self._embed([query])
+        
+        index_results = self._search_index(query_embeddings, where_clause, n_results)
+        if index_results is not None:
+            return index_results
+        
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=query_embeddings,
                 n_results=n_results,
                 where=where_clause,  # Use None for no filters
                 include=["metadatas", "documents", "distances"]
@@ -97,7 +382,7 @@ class FinancialVectorStore:
             # Fallback: search without any filters
             try:
                 results = self.collection.query(
-                    query_texts=[query],
+                    query_embeddings=query_embeddings,
                     n_results=n_results,
                     where=None,  # Explicitly None
                     include=["metadatas", "documents", "distances"]
@@ -118,6 +403,20 @@ class FinancialVectorStore:
                 print(f" Fallback search also failed: {e2}")
                 return []
     
+    def search_batch(self, queries: List[str], filters_list: List[Optional[Dict]], n_results: int = 5,
+                     query_embeddings: Optional[List[List[float]]] = None) -> List[List[Dict[str, Any]]]:
+        """search() for several (query, filters) pairs, encoding all queries in one model pass
+        
+        Each query keeps its own filters, which neither FAISS nor a single Chroma
+        query can take per row, so the lookups themselves still run one by one.
+        """
+        if query_embeddings is None:
+            query_embeddings = self._embed(queries) if queries else []
+        return [
+            self.search(query, filters, n_results, query_embedding=query_embedding)
+            for query, filters, query_embedding in zip(queries, filters_list, query_embeddings)
+        ]
+    
     def _build_filter_condition(self, filters: Dict) -> Dict:
         """Build ChromaDB filter condition - SIMPLIFIED VERSION"""
         if not filters:
@@ -1,12 +1,195 @@
 # evaluation/llm_judge.py
 import openai
-from typing import Dict, Any, List
+import httpx
+import asyncio
+import threading
+import time
+import os
+import re
+import hashlib
+import random
+from typing import Dict, Any, List, Optional
 import json
+import numpy as np
 from config.settings import settings
 
+# Optional ANN index for paraphrase hits in the judge cache
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+JUDGE_CACHE_DIR = ".judge_cache"
+JUDGE_EMBEDDING_MODEL = "text-embedding-3-small"
+JUDGE_MODEL = "gpt-4o"
+# Part of the cache file name, with JUDGE_MODEL: bump whenever the judge prompts
+# or score parsing change so earlier judgements are not served again
+JUDGE_CACHE_VERSION = 2
+# Nearest cached judgements checked for one with the same figures
+JUDGE_SIMILAR_CANDIDATES = 8
+
+_NUMBER_RE = re.compile(r"\d+")
+
+SCORE_WEIGHTS = {'accuracy': 0.4, 'completeness': 0.25, 'clarity': 0.15, 'sourcing': 0.1, 'insight': 0.1}
+# Fixed category order so the weighted score is a single dot product
+_SCORE_CATEGORIES = tuple(SCORE_WEIGHTS)
+_SCORE_WEIGHT_VECTOR = np.array([SCORE_WEIGHTS[category] for category in _SCORE_CATEGORIES], dtype=np.float64)
+
+# The judge writes "scores" before "feedback"; once this object has streamed in,
+# the rest of the reply is only prose
+_SCORES_OBJECT_RE = re.compile(r'"scores"\s*:\s*(\{[^{}]*\})')
+
+# Answers shorter than this (stripped) are scored 0 without calling the judge
+MIN_JUDGE_ANSWER_LENGTH = 20
+
+# Keep-alive connections to OpenAI; bounded so bursts queue instead of thrashing
+JUDGE_MAX_CONNECTIONS = 20
+JUDGE_HTTP_TIMEOUT = 60.0
+
+_CLIENT: Optional[openai.OpenAI] = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_openai_client() -> openai.OpenAI:
+    """Process-wide sync OpenAI client on a bounded keep-alive connection pool"""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = openai.OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_connections=JUDGE_MAX_CONNECTIONS,
+                                            max_keepalive_connections=JUDGE_MAX_CONNECTIONS),
+                        timeout=JUDGE_HTTP_TIMEOUT
+                    )
+                )
+    return _CLIENT
+
+# Transient OpenAI failures are retried with jittered exponential backoff rather
+# than being recorded as a zero score
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError)
+JUDGE_MAX_ATTEMPTS = 5
+JUDGE_BACKOFF_MAX = 60.0
+
+def _backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based): 1, 2, 4... plus jitter, capped"""
+    return min(JUDGE_BACKOFF_MAX, 2 ** (attempt - 1)) + random.uniform(0, 1)
+
+class AsyncRateLimiter:
+    """Token bucket capping judge requests per minute across concurrent tasks"""
+    
+    def __init__(self, requests_per_minute: int):
+        self.rate = requests_per_minute / 60.0
+        # Allow short bursts of up to ten seconds' worth of requests
+        self.capacity = max(1.0, self.rate * 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class JudgeCache:
+    """Persistent (query, answer) -> evaluation cache with an embedding-similarity fallback
+    
+    Entries are appended to a JSONL file; exact hits are a sha256 lookup, and
+    near-duplicates are found by cosine similarity over a FAISS inner-product index.
+    A near match only counts when the query and answer mention the same numbers:
+    "AED 4,512M" and "AED 5,412M" embed almost identically but must not share a score.
+    """
+    
+    def __init__(self, cache_dir: str = JUDGE_CACHE_DIR, similarity_threshold: float = 0.97):
+        # Both tiers load from this file, so a new version or model starts an empty cache
+        self.path = os.path.join(cache_dir, f"judge_cache_v{JUDGE_CACHE_VERSION}_{JUDGE_MODEL}.jsonl")
+        self.similarity_threshold = similarity_threshold
+        self._exact: Dict[str, Dict[str, Any]] = {}
+        self._semantic_results: List[Dict[str, Any]] = []
+        self._semantic_numbers: List[tuple] = []
+        self.index = None
+        
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        # Entries written without "numbers" stay exact-only
+                        numbers = entry.get("numbers")
+                        self._remember(entry["key"], entry.get("embedding"),
+                                       tuple(numbers) if numbers is not None else None, entry["evaluation"])
+    
+    @staticmethod
+    def make_key(query: str, answer: str) -> str:
+        return hashlib.sha256(f"{query}||{answer}".encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def numbers(query: str, answer: str) -> tuple:
+        return tuple(_NUMBER_RE.findall(f"{query}\n{answer}"))
+    
+    @property
+    def has_semantic_entries(self) -> bool:
+        return self.index is not None and self.index.ntotal > 0
+    
+    def get_exact(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._exact.get(key)
+    
+    def get_similar(self, embedding: List[float], numbers: tuple) -> Optional[Dict[str, Any]]:
+        """Stored evaluation whose embedding clears the cosine threshold and whose figures match"""
+        if not self.has_semantic_entries:
+            return None
+        k = min(JUDGE_SIMILAR_CANDIDATES, self.index.ntotal)
+        similarities, positions = self.index.search(self._normalize(embedding), k)
+        for similarity, position in zip(similarities[0], positions[0]):
+            if position < 0 or similarity < self.similarity_threshold:
+                break
+            if self._semantic_numbers[position] == numbers:
+                return self._semantic_results[position]
+        return None
+    
+    def put(self, key: str, embedding: Optional[List[float]], numbers: tuple, evaluation: Dict[str, Any]):
+        self._remember(key, embedding, numbers, evaluation)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "embedding": embedding, "numbers": list(numbers),
+                                "evaluation": evaluation}) + "\n")
+    
+    def _remember(self, key: str, embedding: Optional[List[float]], numbers: Optional[tuple],
+                  evaluation: Dict[str, Any]):
+        self._exact[key] = evaluation
+        if embedding is None or numbers is None or not FAISS_AVAILABLE:
+            return
+        vector = self._normalize(embedding)
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(vector.shape[1])
+        self.index.add(vector)
+        self._semantic_results.append(evaluation)
+        self._semantic_numbers.append(numbers)
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray([embedding], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
 class LLMJudge:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, use_cache: bool = True, requests_per_minute: int = 500, scores_only: bool = False):
+        self.client = get_openai_client()
+        # Async client for batch judging; opened per run because httpx async
+        # connections are tied to the event loop that asyncio.run creates
+        self.aclient = None
+        self.requests_per_minute = requests_per_minute
+        # Stream single judgements and stop reading once the scores are in, skipping feedback
+        self.scores_only = scores_only
+        # Re-runs of the same test set mostly re-judge identical or paraphrased answers
+        self.cache = JudgeCache() if use_cache else None
         self.evaluation_prompt = """
         You are an expert financial analyst evaluating AI-generated financial analysis.
         
@@ -21,31 +204,89 @@ class LLMJudge:
         4. SOURCING (10%): Are data sources properly cited?
         5. INSIGHT (10%): Does it provide valuable business insights?
         
-        Scoring scale: 1-10 for each category, then calculate weighted average.
+        Scoring scale: 1-10 for each category.
         
-        Provide specific feedback for improvement.
+        Reply with a JSON object only, in exactly this shape:
+        {{"scores": {{"accuracy": <int>, "completeness": <int>, "clarity": <int>, "sourcing": <int>, "insight": <int>}},
+          "feedback": "<specific feedback for improvement>"}}
         """
+        # Several judgements per completion: one system prompt and round-trip for k items
+        self.group_evaluation_prompt = """
+        You are an expert financial analyst evaluating {count} AI-generated financial analyses.
+        
+        {items}
+        
+        Evaluate EACH response independently on these criteria:
+        
+        1. ACCURACY (40%): Are the financial figures correct? Are calculations accurate?
+        2. COMPLETENESS (25%): Does it fully address the query? Any missing elements?
+        3. CLARITY (15%): Is the explanation clear and well-structured?
+        4. SOURCING (10%): Are data sources properly cited?
+        5. INSIGHT (10%): Does it provide valuable business insights?
+        
+        Scoring scale: 1-10 for each category.
+        
+        Reply with a JSON object only, with one entry per item, in exactly this shape:
+        {{"evaluations": [{{"id": <item number>,
+                           "scores": {{"accuracy": <int>, "completeness": <int>, "clarity": <int>, "sourcing": <int>, "insight": <int>}},
+                           "feedback": "<specific feedback for improvement>"}}]}}
+        """
+    
+    def _completion_request(self, query: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion arguments for judging one response"""
+        prompt = self.evaluation_prompt.format(
+            query=query,
+            response=response.get("answer", "")
+        )
+        return {
+            "model": JUDGE_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are a strict but fair financial analysis evaluator."},
+                {"role": "user", "content": prompt}
+            ],
+            # JSON mode: the reply is parsed with json.loads, no scraping
+            "response_format": {"type": "json_object"},
+            "temperature": 0.1,
+            "max_tokens": 500
+        }
     
-    def evaluate_response(self, query: str, response: Dict[str, Any]) -> Dict[str, Any]:
+    def evaluate_response(self, query: str, response: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
         """Use LLM to evaluate response quality"""
+        trivial = self._trivial_evaluation(query, response)
+        if trivial is not None:
+            return trivial
+        
         try:
-            prompt = self.evaluation_prompt.format(
-                query=query,
-                response=response.get("answer", "")
-            )
+            cache = self.cache if use_cache else None
+            answer = response.get("answer", "")
+            embedding = None
+            if cache is not None:
+                key = JudgeCache.make_key(query, answer)
+                cached = cache.get_exact(key)
+                if cached is not None:
+                    return self._for_pair(cached, query, response)
+                numbers = JudgeCache.numbers(query, answer)
+                # Nothing to compare against until the first embedded judgement is stored
+                if FAISS_AVAILABLE and cache.has_semantic_entries:
+                    embedding = self._embed(query, answer)
+                    if embedding is not None:
+                        cached = cache.get_similar(embedding, numbers)
+                        if cached is not None:
+                            return self._for_pair(cached, query, response)
             
-            completion = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a strict but fair financial analysis evaluator."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=1000
-            )
-            
-            evaluation_text = completion.choices[0].message.content
-            return self._parse_evaluation(evaluation_text, query, response)
+            if self.scores_only:
+                evaluation_text = self._stream_scores(self._completion_request(query, response))
+            else:
+                completion = self._call_judge(self._completion_request(query, response))
+                evaluation_text = completion.choices[0].message.content
+            evaluation = self._parse_evaluation(evaluation_text, query, response)
+            # Streamed judgements stop before the feedback, so they are never
+            # stored where full evaluations are expected
+            if cache is not None and not self.scores_only:
+                if embedding is None and FAISS_AVAILABLE:
+                    embedding = self._embed(query, answer)
+                cache.put(key, embedding, numbers, evaluation)
+            return evaluation
             
         except Exception as e:
             return {
@@ -54,57 +295,346 @@ class LLMJudge:
                 "categories": {}
             }
     
+    def _group_completion_request(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Chat completion arguments for judging several results in one call"""
+        numbered = "\n\n        ".join(
+            f"ITEM {number}\n        QUERY: {item['query']}\n        RESPONSE: {item['response'].get('answer', '')}"
+            for number, item in enumerate(items, 1)
+        )
+        return {
+            "model": JUDGE_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are a strict but fair financial analysis evaluator."},
+                {"role": "user", "content": self.group_evaluation_prompt.format(count=len(items), items=numbered)}
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.1,
+            "max_tokens": 500 * len(items)
+        }
+    
+    def _embed(self, query: str, answer: str) -> Optional[List[float]]:
+        """Embedding of a (query, answer) pair, or None if the call fails
+        
+        Semantic caching is best-effort; a failure only means the judge is called.
+        """
+        try:
+            return self.client.embeddings.create(
+                model=JUDGE_EMBEDDING_MODEL,
+                input=f"{query}\n{answer}"
+            ).data[0].embedding
+        except Exception:
+            return None
+    
+    async def _aembed(self, pairs: List[tuple], semaphore: asyncio.Semaphore) -> List[Optional[List[float]]]:
+        """Embeddings of several (query, answer) pairs in one request; all None if it fails"""
+        if not pairs:
+            return []
+        try:
+            async with semaphore:
+                data = (await self.aclient.embeddings.create(
+                    model=JUDGE_EMBEDDING_MODEL,
+                    input=[f"{query}\n{answer}" for query, answer in pairs]
+                )).data
+            return [item.embedding for item in data]
+        except Exception:
+            return [None] * len(pairs)
+    
+    async def _acache_lookup(self, query: str, response: Dict[str, Any], semaphore: asyncio.Semaphore) -> tuple:
+        """(cached evaluation or None, cache key, embedding) for one judgement"""
+        if self.cache is None:
+            return None, None, None
+        
+        answer = response.get("answer", "")
+        key = JudgeCache.make_key(query, answer)
+        cached = self.cache.get_exact(key)
+        if cached is None and FAISS_AVAILABLE and self.cache.has_semantic_entries:
+            embedding = (await self._aembed([(query, answer)], semaphore))[0]
+            if embedding is None:
+                return None, key, None
+            cached = self.cache.get_similar(embedding, JudgeCache.numbers(query, answer))
+            if cached is None:
+                return None, key, embedding
+        return (self._for_pair(cached, query, response) if cached is not None else None), key, None
+    
+    def _call_judge(self, request: Dict[str, Any]):
+        """chat.completions.create with backoff on rate-limit and connection errors"""
+        for attempt in range(1, JUDGE_MAX_ATTEMPTS + 1):
+            try:
+                return self.client.chat.completions.create(**request)
+            except RETRYABLE_ERRORS:
+                if attempt == JUDGE_MAX_ATTEMPTS:
+                    raise
+                time.sleep(_backoff_delay(attempt))
+    
+    def _stream_scores(self, request: Dict[str, Any]) -> str:
+        """Stream a judgement and hang up as soon as the complete scores object arrives"""
+        stream = self._call_judge({**request, "stream": True})
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                parts.append(chunk.choices[0].delta.content)
+                if "}" in parts[-1]:
+                    match = _SCORES_OBJECT_RE.search("".join(parts))
+                    if match:
+                        return json.dumps({"scores": json.loads(match.group(1))})
+        finally:
+            stream.close()
+        return "".join(parts)
+    
+    async def _acall_judge(self, request: Dict[str, Any], limiter: AsyncRateLimiter):
+        """Async _call_judge; every attempt first takes a token from the rate limiter"""
+        for attempt in range(1, JUDGE_MAX_ATTEMPTS + 1):
+            await limiter.acquire()
+            try:
+                return await self.aclient.chat.completions.create(**request)
+            except RETRYABLE_ERRORS:
+                if attempt == JUDGE_MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt))
+    
+    async def _aevaluate_group(self, items: List[Dict[str, Any]], semaphore: asyncio.Semaphore,
+                               limiter: AsyncRateLimiter) -> List[Dict[str, Any]]:
+        """Judge several results in a single completion; the semaphore caps requests in flight"""
+        async with semaphore:
+            try:
+                completion = await self._acall_judge(self._group_completion_request(items), limiter)
+                data = json.loads(completion.choices[0].message.content)
+                by_number = {str(entry.get("id")): entry for entry in data["evaluations"]}
+            except Exception as e:
+                return [{"error": str(e), "overall_score": 0, "categories": {}} for _ in items]
+        
+        evaluations = []
+        for number, item in enumerate(items, 1):
+            try:
+                entry = by_number[str(number)]
+                evaluations.append(self._parse_evaluation(json.dumps(entry), item["query"], item["response"]))
+            except (KeyError, ValueError, TypeError) as e:
+                evaluations.append({
+                    "error": f"No usable evaluation for item {number}: {e}",
+                    "overall_score": 0,
+                    "categories": {}
+                })
+        return evaluations
+    
+    def _trivial_evaluation(self, query: str, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Deterministic zero score for empty or near-empty answers, else None"""
+        answer = response.get("answer", "") or ""
+        if len(answer.strip()) >= MIN_JUDGE_ANSWER_LENGTH:
+            return None
+        return {
+            "overall_score": 0.0,
+            "category_scores": {},
+            "feedback": "",
+            "evaluation_text": "empty/too-short answer",
+            "query": query,
+            "response_preview": answer[:200] + "..."
+        }
+    
+    @staticmethod
+    def _for_pair(evaluation: Dict[str, Any], query: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a cached evaluation describing this (query, response) pair
+        
+        A semantic hit was stored for a different pair; its scores carry over,
+        but its query and preview must not end up in this test's report.
+        """
+        return {
+            **evaluation,
+            "query": query,
+            "response_preview": response.get("answer", "")[:200] + "..."
+        }
+    
     def _parse_evaluation(self, evaluation_text: str, query: str, response: Dict[str, Any]) -> Dict[str, Any]:
         """Parse LLM evaluation into structured format"""
-        # Simple parsing - in production you'd use more sophisticated parsing
-        lines = evaluation_text.split('\n')
-        
-        scores = {}
-        current_category = None
-        
-        for line in lines:
-            line = line.strip()
-            if any(category in line.lower() for category in ['accuracy', 'completeness', 'clarity', 'sourcing', 'insight']):
-                # Extract category and score
-                for category in ['ACCURACY', 'COMPLETENESS', 'CLARITY', 'SOURCING', 'INSIGHT']:
-                    if category in line.upper():
-                        current_category = category.lower()
-                        # Try to extract score
-                        import re
-                        score_match = re.search(r'(\d+)/10', line)
-                        if score_match:
-                            scores[current_category] = int(score_match.group(1))
-                        break
+        # Malformed JSON raises, so callers report an error instead of silent zero scores
+        data = json.loads(evaluation_text)
+        scores = {category: int(score) for category, score in data["scores"].items() if category in SCORE_WEIGHTS}
         
         # Calculate weighted average
-        weights = {'accuracy': 0.4, 'completeness': 0.25, 'clarity': 0.15, 'sourcing': 0.1, 'insight': 0.1}
-        overall_score = sum(scores.get(cat, 0) * weight for cat, weight in weights.items())
+        score_vector = np.fromiter((scores.get(cat, 0) for cat in _SCORE_CATEGORIES),
+                                   dtype=np.float64, count=len(_SCORE_CATEGORIES))
+        overall_score = float(score_vector @ _SCORE_WEIGHT_VECTOR)
         
         return {
             "overall_score": round(overall_score, 1),
             "category_scores": scores,
+            "feedback": data.get("feedback", ""),
             "evaluation_text": evaluation_text,
             "query": query,
             "response_preview": response.get("answer", "")[:200] + "..."
         }
     
-    def batch_evaluate(self, test_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Evaluate multiple test results using LLM judge"""
-        evaluations = []
+    async def abatch_evaluate(self, test_results: List[Dict[str, Any]], concurrency: int = 10,
+                              judgements_per_call: int = 5) -> List[Dict[str, Any]]:
+        """Evaluate multiple test results concurrently, at most `concurrency` judge calls at once
         
-        for result in test_results:
-            if result.get("status") == "passed" and "response" in result:
-                print(f"🧠 LLM Evaluating: {result['id']}")
-                
-                evaluation = self.evaluate_response(
-                    result["query"],
-                    result["response"]
-                )
-                
-                evaluations.append({
-                    "test_id": result["id"],
-                    "query": result["query"],
-                    **evaluation
-                })
+        Cache misses are packed `judgements_per_call` to a completion.
+        """
+        # Pool sized to the semaphore: one keep-alive connection per in-flight call
+        async with openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+                timeout=JUDGE_HTTP_TIMEOUT
+            )
+        ) as aclient:
+            self.aclient = aclient
+            try:
+                return await self._abatch_evaluate(test_results, concurrency, judgements_per_call)
+            finally:
+                self.aclient = None
+    
+    async def _abatch_evaluate(self, test_results: List[Dict[str, Any]], concurrency: int,
+                               judgements_per_call: int) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(concurrency)
+        # Created per run: asyncio primitives belong to the loop asyncio.run starts
+        limiter = AsyncRateLimiter(self.requests_per_minute)
+        to_evaluate = self._batch_candidates(test_results)
+        
+        # Identical (query, answer) pairs are judged once and shared by every test that has them
+        unique_positions = {}
+        slots = []
+        unique = []
+        trivial = {}
+        for result in to_evaluate:
+            print(f"🧠 LLM Evaluating: {result['id']}")
+            # Empty/too-short answers never reach the API
+            evaluation = self._trivial_evaluation(result["query"], result["response"])
+            if evaluation is not None:
+                trivial[id(result)] = evaluation
+                continue
+            pair_key = JudgeCache.make_key(result["query"], result["response"].get("answer", ""))
+            if pair_key not in unique_positions:
+                unique_positions[pair_key] = len(unique)
+                unique.append(result)
+            slots.append(unique_positions[pair_key])
         
-        return evaluations
\ No newline at end of file
+        lookups = await asyncio.gather(*(
+            self._acache_lookup(result["query"], result["response"], semaphore)
+            for result in unique
+        ))
+        evaluations = [cached for cached, _, _ in lookups]
+        
+        misses = [i for i, evaluation in enumerate(evaluations) if evaluation is None]
+        groups = [misses[i:i + judgements_per_call] for i in range(0, len(misses), judgements_per_call)]
+        group_evaluations = await asyncio.gather(*(
+            self._aevaluate_group([unique[i] for i in group], semaphore, limiter)
+            for group in groups
+        ))
+        
+        judged_now = []
+        for group, results in zip(groups, group_evaluations):
+            for i, evaluation in zip(group, results):
+                evaluations[i] = evaluation
+                if lookups[i][1] is not None and "error" not in evaluation:
+                    judged_now.append(i)
+        
+        if judged_now:
+            # Pairs not embedded during lookup (empty index, failed call) get one batched request
+            to_embed = [i for i in judged_now if lookups[i][2] is None] if FAISS_AVAILABLE else []
+            new_embeddings = dict(zip(to_embed, await self._aembed(
+                [(unique[i]["query"], unique[i]["response"].get("answer", "")) for i in to_embed], semaphore
+            )))
+            for i in judged_now:
+                _, key, embedding = lookups[i]
+                query, answer = unique[i]["query"], unique[i]["response"].get("answer", "")
+                self.cache.put(key, embedding if embedding is not None else new_embeddings.get(i),
+                               JudgeCache.numbers(query, answer), evaluations[i])
+        
+        judged = iter(slots)
+        return [
+            {
+                "test_id": result["id"],
+                "query": result["query"],
+                **(trivial[id(result)] if id(result) in trivial else evaluations[next(judged)])
+            }
+            for result in to_evaluate
+        ]
+    
+    def _batch_candidates(self, test_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Results worth judging: passed tests that produced a response"""
+        return [
+            result for result in test_results
+            if result.get("status") == "passed" and "response" in result
+        ]
+    
+    def submit_batch(self, test_results: List[Dict[str, Any]]) -> str:
+        """Queue judgements on the OpenAI Batch API (half price, 24h window); returns the batch id"""
+        lines = [
+            json.dumps({
+                "custom_id": str(result["id"]),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._completion_request(result["query"], result["response"])
+            })
+            for result in self._batch_candidates(test_results)
+        ]
+        
+        batch_file = self.client.files.create(
+            file=("judge_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"🧠 Submitted {len(lines)} evaluations as batch {batch.id}")
+        return batch.id
+    
+    def poll_batch(self, batch_id: str, test_results: List[Dict[str, Any]],
+                   poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """Wait for a submitted batch and parse its output like batch_evaluate"""
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            time.sleep(poll_interval)
+        
+        if not batch.output_file_id:
+            print(f" Batch {batch_id} finished with status {batch.status} and no output")
+            return []
+        
+        results_by_id = {str(result["id"]): result for result in self._batch_candidates(test_results)}
+        output = self.client.files.content(batch.output_file_id).text
+        
+        evaluations = []
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            result = results_by_id.get(record["custom_id"])
+            if result is None:
+                continue
+            
+            body = (record.get("response") or {}).get("body") or {}
+            if record.get("error") or not body.get("choices"):
+                evaluation = {
+                    "error": str(record.get("error") or body.get("error")),
+                    "overall_score": 0,
+                    "categories": {}
+                }
+            else:
+                evaluation_text = body["choices"][0]["message"]["content"]
+                try:
+                    evaluation = self._parse_evaluation(evaluation_text, result["query"], result["response"])
+                except (ValueError, KeyError, TypeError) as e:
+                    evaluation = {
+                        "error": f"Unparseable evaluation: {e}",
+                        "overall_score": 0,
+                        "categories": {}
+                    }
+            
+            evaluations.append({
+                "test_id": result["id"],
+                "query": result["query"],
+                **evaluation
+            })
+        
+        return evaluations
+    
+    def batch_evaluate(self, test_results: List[Dict[str, Any]], concurrency: int = 10,
+                       judgements_per_call: int = 5) -> List[Dict[str, Any]]:
+        """Evaluate multiple test results using LLM judge"""
+        return asyncio.run(self.abatch_evaluate(test_results, concurrency, judgements_per_call))
\ No newline at end of file
@@ -1,213 +1,546 @@
 # evaluation/test_suite.py
 import json
-from typing import List, Dict, Any
+import os
+import re
+import functools
+import pickle
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from itertools import chain
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from datetime import datetime
+import numpy as np
+import pandas as pd
 
+# Optional fast JSON encoder for the results file
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-class FinancialTestSuite:
-    def __init__(self):
-        self.test_cases = self._load_test_cases()
-    
-    def _load_test_cases(self) -> List[Dict[str, Any]]:
-        """Load 20+ comprehensive test cases covering all requirements"""
-        return [
-            # === SIMPLE FACTUAL QUERIES (5 cases) ===
-            {
-                "id": "TF-001",
-                "query": "What was FAB's net profit in Q1 2022?",
-                "category": "single_fact",
-                "expected_metrics": ["net_profit"],
-                "expected_periods": ["2022_Q1"],
-                "difficulty": "easy",
-                "requires_calculation": False
-            },
-            {
-                "id": "TF-002", 
-                "query": "What were the total assets reported in Q3 2022?",
-                "category": "single_fact",
-                "expected_metrics": ["total_assets"],
-                "expected_periods": ["2022_Q3"],
-                "difficulty": "easy",
-                "requires_calculation": False
-            },
-            {
-                "id": "TF-003",
-                "query": "How much were total loans in Q4 2022?",
-                "category": "single_fact", 
-                "expected_metrics": ["total_loans"],
-                "expected_periods": ["2022_Q4"],
-                "difficulty": "easy",
-                "requires_calculation": False
-            },
-            {
-                "id": "TF-004",
-                "query": "What was the shareholder equity in Q2 2023?",
-                "category": "single_fact",
-                "expected_metrics": ["shareholder_equity"],
-                "expected_periods": ["2023_Q2"],
-                "difficulty": "easy",
-                "requires_calculation": False
-            },
-            {
-                "id": "TF-005",
-                "query": "What were total deposits in Q1 2023?",
-                "category": "single_fact",
-                "expected_metrics": ["total_deposits"],
-                "expected_periods": ["2023_Q1"],
-                "difficulty": "easy",
-                "requires_calculation": False
-            },
+# Concurrent test cases; each one mostly waits on LLM / vector store I/O
+TEST_PARALLELISM = int(os.getenv("FAB_TEST_PARALLELISM", "4"))
+# "thread" shares one orchestrator across threads (I/O-bound queries); "process"
+# runs queries in worker processes with their own orchestrator, for when
+# CPU-bound post-processing is GIL-limited. Compare the logged wall times.
+TEST_EXECUTOR = os.getenv("FAB_TEST_EXECUTOR", "thread")
 
-            # === MULTI-HOP REASONING (5 cases) ===
-            {
-                "id": "MH-001",
-                "query": "What was the year-over-year percentage change in Net Profit between Q3 2022 and Q3 2023? Calculate the growth rate and explain the key factors driving this change.",
-                "category": "multi_hop",
-                "expected_metrics": ["net_profit"],
-                "expected_periods": ["2022_Q3", "2023_Q3"],
-                "requires_calculation": True,
-                "requires_synthesis": True,
-                "difficulty": "hard"
-            },
-            {
-                "id": "MH-002",
-                "query": "How has FAB's Return on Equity (ROE) trended over the last 4 quarters? Calculate the ROE for each quarter and identify the best and worst performing quarters.",
-                "category": "multi_hop", 
-                "expected_metrics": ["net_profit", "shareholder_equity"],
-                "expected_periods": ["2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3"],
-                "requires_calculation": True,
-                "requires_temporal": True,
-                "difficulty": "hard"
-            },
-            {
-                "id": "MH-003",
-                "query": "Compare FAB's loan-to-deposit ratio between Q4 2022 and Q4 2023. Has the bank's lending activity increased or decreased relative to its deposit base?",
-                "category": "multi_hop",
-                "expected_metrics": ["total_loans", "total_deposits"],
-                "expected_periods": ["2022_Q4", "2023_Q4"],
-                "requires_calculation": True,
-                "requires_comparison": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "MH-004",
-                "query": "What were the top 2 risk factors mentioned in the 2023 reports, and how did management address them in subsequent quarters?",
-                "category": "multi_hop",
-                "expected_metrics": [],
-                "expected_periods": ["2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
-                "requires_risk_analysis": True,
-                "requires_synthesis": True,
-                "difficulty": "hard"
-            },
-            {
-                "id": "MH-005", 
-                "query": "Analyze the trend in net interest income over the last 6 quarters and explain the key drivers mentioned in management discussions.",
-                "category": "multi_hop",
-                "expected_metrics": ["net_interest_income"],
-                "expected_periods": ["2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3"],
-                "requires_temporal": True,
-                "requires_synthesis": True,
-                "difficulty": "hard"
-            },
+# Progress lines are written at most this often, in batches of up to LOG_MAX_BATCH
+LOG_FLUSH_INTERVAL = 0.05
+LOG_MAX_BATCH = 64
 
-            # === CALCULATION-HEAVY QUERIES (5 cases) ===
-            {
-                "id": "CH-001",
-                "query": "Calculate the quarterly growth rate of total assets from Q1 2022 to Q4 2022.",
-                "category": "calculation",
-                "expected_metrics": ["total_assets"],
-                "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4"],
-                "requires_calculation": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "CH-002",
-                "query": "What was the average Return on Equity (ROE) across all quarters of 2022?",
-                "category": "calculation",
-                "expected_metrics": ["net_profit", "shareholder_equity"],
-                "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4"],
-                "requires_calculation": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "CH-003",
-                "query": "Calculate the loan-to-deposit ratio for each quarter in 2023 and identify the quarter with the highest ratio.",
-                "category": "calculation",
-                "expected_metrics": ["total_loans", "total_deposits"],
-                "expected_periods": ["2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
-                "requires_calculation": True,
-                "requires_comparison": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "CH-004",
-                "query": "What percentage of total assets were comprised of loans in Q2 2023?",
-                "category": "calculation",
-                "expected_metrics": ["total_loans", "total_assets"],
-                "expected_periods": ["2023_Q2"],
-                "requires_calculation": True,
-                "difficulty": "easy"
-            },
-            {
-                "id": "CH-005",
-                "query": "Calculate the compound quarterly growth rate of net profit from Q1 2022 to Q4 2023.",
-                "category": "calculation",
-                "expected_metrics": ["net_profit"],
-                "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
-                "requires_calculation": True,
-                "difficulty": "hard"
-            },
+# Orchestrator responses kept between test runs, keyed by normalized query text
+QUERY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".query_cache.pkl")
+QUERY_CACHE_SIZE = 512
+# Cosine similarity above which a paraphrased query reuses a cached response
+QUERY_SIMILARITY_THRESHOLD = 0.95
 
-            # === TEMPORAL COMPARISONS (3 cases) ===
-            {
-                "id": "TC-001",
-                "query": "Compare FAB's net profit in Q1 2022 vs Q1 2023. What was the absolute and percentage difference?",
-                "category": "temporal_comparison",
-                "expected_metrics": ["net_profit"],
-                "expected_periods": ["2022_Q1", "2023_Q1"],
-                "requires_calculation": True,
-                "requires_comparison": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "TC-002",
-                "query": "How did total deposits change from Q4 2022 to Q4 2023? Show the trend across all intermediate quarters.",
-                "category": "temporal_comparison",
-                "expected_metrics": ["total_deposits"],
-                "expected_periods": ["2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
-                "requires_temporal": True,
-                "requires_calculation": True,
-                "difficulty": "medium"
-            },
-            {
-                "id": "TC-003",
-                "query": "Analyze the seasonality pattern in FAB's financial performance across quarters. Which quarter typically shows the strongest results?",
-                "category": "temporal_comparison", 
-                "expected_metrics": ["net_profit"],
-                "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
-                "requires_temporal": True,
-                "requires_analysis": True,
-                "difficulty": "hard"
-            },
+_WHITESPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+")
+# Sentence punctuation dropped from cache keys. ". % - /" stay because they
+# carry meaning in figures ("1.5%" vs "15%", "loan-to-deposit", "Q1/Q2")
+_QUERY_PUNCT_TABLE = str.maketrans("", "", "?!,;:'\"`()[]{}")
 
-            # === EDGE CASES (2 cases) ===
-            {
-                "id": "EC-001",
-                "query": "What was FAB's net profit in Q5 2023?",
-                "category": "edge_case",
-                "expected_behavior": "refuse",
-                "expected_response": "should clarify that Q5 doesn't exist",
-                "difficulty": "easy"
-            },
-            {
-                "id": "EC-002",
-                "query": "Compare FAB's performance with Emirates NBD in Q2 2023.",
-                "category": "edge_case", 
-                "expected_behavior": "refuse",
-                "expected_response": "should state it only has FAB data",
-                "difficulty": "easy"
-            }
-        ]
+def normalize_query(query: str) -> str:
+    return _WHITESPACE_RE.sub(" ", query.lower().translate(_QUERY_PUNCT_TABLE)).strip()
+
+class QueryCache:
+    """LRU cache of orchestrator responses with an embedding-similarity fallback
+    
+    Exact hits are a dict lookup on the normalized query. Misses are compared by
+    cosine similarity against every cached query embedding in one matrix product;
+    a near match only counts when both queries mention the same numbers, so
+    "Q1 2022" never answers for "Q2 2022".
+    
+    Responses are stored and handed out by reference; the suite only reads
+    them and defers JSON conversion to save_results.
+    """
+    
+    def __init__(self, path: str = QUERY_CACHE_PATH, maxsize: int = QUERY_CACHE_SIZE,
+                 similarity_threshold: float = QUERY_SIMILARITY_THRESHOLD, version: str = ""):
+        self.path = path
+        self.version = version
+        self.maxsize = maxsize
+        self.similarity_threshold = similarity_threshold
+        # normalized query -> (unit embedding or None, response)
+        self._entries: "OrderedDict[str, Tuple[Optional[np.ndarray], Dict[str, Any]]]" = OrderedDict()
+        self._matrix = None
+        self._matrix_keys: List[str] = []
+        self._lock = threading.Lock()
+        self._model = None
+        self._model_failed = False
+        
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    stored = pickle.load(f)
+                if stored.get("version") == version:
+                    self._entries.update(stored["entries"])
+                    print(f"🗂️ Loaded {len(self._entries)} cached query responses")
+                else:
+                    print(f"🗂️ Query cache is from pipeline/data version {stored.get('version')!r}, starting fresh")
+            except Exception as e:
+                print(f"⚠️ Ignoring unreadable query cache {path}: {e}")
+    
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+        
+        embedding = self._embed(key)
+        if embedding is None:
+            return None
+        
+        with self._lock:
+            matrix, keys = self._similarity_matrix()
+            if matrix is None:
+                return None
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            match = keys[best]
+            if (similarities[best] < self.similarity_threshold
+                    or _NUMBER_RE.findall(match) != _NUMBER_RE.findall(key)
+                    or match not in self._entries):
+                return None
+            self._entries.move_to_end(match)
+            return self._entries[match][1]
+    
+    def put(self, query: str, response: Dict[str, Any]):
+        key = normalize_query(query)
+        embedding = self._embed(key)
+        with self._lock:
+            self._entries[key] = (embedding, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def save(self):
+        with self._lock:
+            try:
+                with open(self.path, "wb") as f:
+                    pickle.dump({"version": self.version, "entries": dict(self._entries)},
+                                f, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                print(f"⚠️ Could not save query cache: {e}")
+    
+    def clear(self):
+        """Drop every cached response, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+    
+    def _similarity_matrix(self):
+        """Stacked unit embeddings of cached queries, rebuilt only after a put"""
+        if self._matrix is None:
+            self._matrix_keys = [key for key, (emb, _) in self._entries.items() if emb is not None]
+            if self._matrix_keys:
+                self._matrix = np.stack([self._entries[key][0] for key in self._matrix_keys])
+        return self._matrix, self._matrix_keys
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Unit-length query embedding, or None when no embedding model can be loaded"""
+        if self._model_failed:
+            return None
+        if self._model is None:
+            try:
+                from data_processing.vector_store import get_embedding_model
+                self._model = get_embedding_model()
+            except Exception as e:
+                print(f"⚠️ Semantic query cache disabled: {e}")
+                self._model_failed = True
+                return None
+        return np.asarray(
+            self._model.encode([text], normalize_embeddings=True)[0], dtype=np.float32
+        )
+
+
+def _json_default(value: Any) -> Any:
+    """Encode what json/orjson can't natively: Pydantic models (FinancialDataPoint), numpy scalars"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class _BufferedLogger:
+    """Progress log drained by one writer thread, one stdout write per batch of lines"""
+    
+    _STOP = object()
+    
+    def __init__(self, interval: float = LOG_FLUSH_INTERVAL, max_batch: int = LOG_MAX_BATCH):
+        self._queue = queue.SimpleQueue()
+        self.interval = interval
+        self.max_batch = max_batch
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+    
+    def log(self, line: str):
+        self._queue.put(line)
+    
+    def close(self):
+        """Write everything logged so far and stop the writer thread"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+    
+    def _drain(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            # Gather whatever else arrives within the flush interval
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=self.interval)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            sys.stdout.write("\n".join(batch) + "\n")
+            sys.stdout.flush()
+
+# Orchestrator of a process-pool worker, built once by _init_worker
+_WORKER_ORCHESTRATOR = None
+
+def _init_worker():
+    global _WORKER_ORCHESTRATOR
+    from agents.orchestrator import OrchestratorAgent
+    _WORKER_ORCHESTRATOR = OrchestratorAgent()
+
+def _worker_process_query(query: str) -> Dict[str, Any]:
+    return _WORKER_ORCHESTRATOR.process_query(query)
+
+def _process_query_in_pool(pool: ProcessPoolExecutor, query: str) -> Dict[str, Any]:
+    return pool.submit(_worker_process_query, query).result()
+
+@dataclass(slots=True)
+class CaseResult:
+    """Outcome of one test case; refers to the shared case dict instead of copying it"""
+    case: Dict[str, Any]
+    status: str
+    execution_time: float
+    response: Optional[Dict[str, Any]] = None
+    evaluation: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cached: bool = False
+    
+    def to_json_dict(self) -> Dict[str, Any]:
+        """Flat record (case fields plus outcome) as written to test_results.json"""
+        record = {**self.case, "status": self.status}
+        if self.error is not None:
+            record.update(error=self.error, execution_time=self.execution_time)
+        else:
+            record.update(response=self.response, evaluation=self.evaluation,
+                          execution_time=self.execution_time, cached=self.cached)
+        return record
+
+def save_results(results: Dict[str, Any], path: str):
+    """Write results as indented JSON, via orjson when installed"""
+    results = {
+        **results,
+        "detailed_results": [r.to_json_dict() for r in results["detailed_results"]]
+    }
+    if ORJSON_AVAILABLE:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(
+                results,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ))
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, default=_json_default)
+
+class CheckPlan(NamedTuple):
+    """What a test case requires of its response, resolved once from the static case definition"""
+    needs_data_points: bool
+    needs_calculations: bool
+    min_answer_length: int = 10
+    min_confidence: float = 0.5
+
+def _compile_plan(test_case: Dict[str, Any]) -> CheckPlan:
+    return CheckPlan(
+        needs_data_points=test_case["category"] not in ["edge_case"],
+        needs_calculations=bool(test_case.get("requires_calculation"))
+    )
+
+@functools.lru_cache(maxsize=1024)
+def _evaluate_checks(plan: CheckPlan, answer_length: int, data_point_count: int,
+                     has_calculations: bool, confidence: float) -> Tuple[bool, Tuple[str, ...], Tuple[str, ...]]:
+    """Pass/fail checks over the few response features they read, memoized across re-runs
+    
+    Keyed on those features rather than a hash of the whole response, which
+    would cost more to compute than the checks themselves.
+    """
+    passed = True
+    checks = []
+    issues = []
+    
+    # Check if answer is provided
+    if answer_length < plan.min_answer_length:
+        passed = False
+        issues.append("Answer is empty or too short")
+    
+    # Check data points were extracted
+    if plan.needs_data_points:
+        if not data_point_count:
+            passed = False
+            issues.append("No data points extracted")
+        else:
+            checks.append(f"Extracted {data_point_count} data points")
+    
+    # Check calculations if required
+    if plan.needs_calculations and not has_calculations:
+        passed = False
+        issues.append("No calculations performed for calculation-required query")
+    
+    # Check confidence score
+    if confidence < plan.min_confidence:
+        issues.append(f"Low confidence score: {confidence}")
+    
+    return passed, tuple(checks), tuple(issues)
+
+# Test cases covering all requirements; built once at import and shared read-only
+# by every suite instance and worker thread
+_TEST_CASES: Tuple[Dict[str, Any], ...] = (
+    # === SIMPLE FACTUAL QUERIES (5 cases) ===
+    {
+        "id": "TF-001",
+        "query": "What was FAB's net profit in Q1 2022?",
+        "category": "single_fact",
+        "expected_metrics": ["net_profit"],
+        "expected_periods": ["2022_Q1"],
+        "difficulty": "easy",
+        "requires_calculation": False
+    },
+    {
+        "id": "TF-002", 
+        "query": "What were the total assets reported in Q3 2022?",
+        "category": "single_fact",
+        "expected_metrics": ["total_assets"],
+        "expected_periods": ["2022_Q3"],
+        "difficulty": "easy",
+        "requires_calculation": False
+    },
+    {
+        "id": "TF-003",
+        "query": "How much were total loans in Q4 2022?",
+        "category": "single_fact", 
+        "expected_metrics": ["total_loans"],
+        "expected_periods": ["2022_Q4"],
+        "difficulty": "easy",
+        "requires_calculation": False
+    },
+    {
+        "id": "TF-004",
+        "query": "What was the shareholder equity in Q2 2023?",
+        "category": "single_fact",
+        "expected_metrics": ["shareholder_equity"],
+        "expected_periods": ["2023_Q2"],
+        "difficulty": "easy",
+        "requires_calculation": False
+    },
+    {
+        "id": "TF-005",
+        "query": "What were total deposits in Q1 2023?",
+        "category": "single_fact",
+        "expected_metrics": ["total_deposits"],
+        "expected_periods": ["2023_Q1"],
+        "difficulty": "easy",
+        "requires_calculation": False
+    },
+
+    # === MULTI-HOP REASONING (5 cases) ===
+    {
+        "id": "MH-001",
+        "query": "What was the year-over-year percentage change in Net Profit between Q3 2022 and Q3 2023? Calculate the growth rate and explain the key factors driving this change.",
+        "category": "multi_hop",
+        "expected_metrics": ["net_profit"],
+        "expected_periods": ["2022_Q3", "2023_Q3"],
+        "requires_calculation": True,
+        "requires_synthesis": True,
+        "difficulty": "hard"
+    },
+    {
+        "id": "MH-002",
+        "query": "How has FAB's Return on Equity (ROE) trended over the last 4 quarters? Calculate the ROE for each quarter and identify the best and worst performing quarters.",
+        "category": "multi_hop", 
+        "expected_metrics": ["net_profit", "shareholder_equity"],
+        "expected_periods": ["2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3"],
+        "requires_calculation": True,
+        "requires_temporal": True,
+        "difficulty": "hard"
+    },
+    {
+        "id": "MH-003",
+        "query": "Compare FAB's loan-to-deposit ratio between Q4 2022 and Q4 2023. Has the bank's lending activity increased or decreased relative to its deposit base?",
+        "category": "multi_hop",
+        "expected_metrics": ["total_loans", "total_deposits"],
+        "expected_periods": ["2022_Q4", "2023_Q4"],
+        "requires_calculation": True,
+        "requires_comparison": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "MH-004",
+        "query": "What were the top 2 risk factors mentioned in the 2023 reports, and how did management address them in subsequent quarters?",
+        "category": "multi_hop",
+        "expected_metrics": [],
+        "expected_periods": ["2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
+        "requires_risk_analysis": True,
+        "requires_synthesis": True,
+        "difficulty": "hard"
+    },
+    {
+        "id": "MH-005", 
+        "query": "Analyze the trend in net interest income over the last 6 quarters and explain the key drivers mentioned in management discussions.",
+        "category": "multi_hop",
+        "expected_metrics": ["net_interest_income"],
+        "expected_periods": ["2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3"],
+        "requires_temporal": True,
+        "requires_synthesis": True,
+        "difficulty": "hard"
+    },
+
+    # === CALCULATION-HEAVY QUERIES (5 cases) ===
+    {
+        "id": "CH-001",
+        "query": "Calculate the quarterly growth rate of total assets from Q1 2022 to Q4 2022.",
+        "category": "calculation",
+        "expected_metrics": ["total_assets"],
+        "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4"],
+        "requires_calculation": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "CH-002",
+        "query": "What was the average Return on Equity (ROE) across all quarters of 2022?",
+        "category": "calculation",
+        "expected_metrics": ["net_profit", "shareholder_equity"],
+        "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4"],
+        "requires_calculation": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "CH-003",
+        "query": "Calculate the loan-to-deposit ratio for each quarter in 2023 and identify the quarter with the highest ratio.",
+        "category": "calculation",
+        "expected_metrics": ["total_loans", "total_deposits"],
+        "expected_periods": ["2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
+        "requires_calculation": True,
+        "requires_comparison": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "CH-004",
+        "query": "What percentage of total assets were comprised of loans in Q2 2023?",
+        "category": "calculation",
+        "expected_metrics": ["total_loans", "total_assets"],
+        "expected_periods": ["2023_Q2"],
+        "requires_calculation": True,
+        "difficulty": "easy"
+    },
+    {
+        "id": "CH-005",
+        "query": "Calculate the compound quarterly growth rate of net profit from Q1 2022 to Q4 2023.",
+        "category": "calculation",
+        "expected_metrics": ["net_profit"],
+        "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
+        "requires_calculation": True,
+        "difficulty": "hard"
+    },
+
+    # === TEMPORAL COMPARISONS (3 cases) ===
+    {
+        "id": "TC-001",
+        "query": "Compare FAB's net profit in Q1 2022 vs Q1 2023. What was the absolute and percentage difference?",
+        "category": "temporal_comparison",
+        "expected_metrics": ["net_profit"],
+        "expected_periods": ["2022_Q1", "2023_Q1"],
+        "requires_calculation": True,
+        "requires_comparison": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "TC-002",
+        "query": "How did total deposits change from Q4 2022 to Q4 2023? Show the trend across all intermediate quarters.",
+        "category": "temporal_comparison",
+        "expected_metrics": ["total_deposits"],
+        "expected_periods": ["2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
+        "requires_temporal": True,
+        "requires_calculation": True,
+        "difficulty": "medium"
+    },
+    {
+        "id": "TC-003",
+        "query": "Analyze the seasonality pattern in FAB's financial performance across quarters. Which quarter typically shows the strongest results?",
+        "category": "temporal_comparison", 
+        "expected_metrics": ["net_profit"],
+        "expected_periods": ["2022_Q1", "2022_Q2", "2022_Q3", "2022_Q4", "2023_Q1", "2023_Q2", "2023_Q3", "2023_Q4"],
+        "requires_temporal": True,
+        "requires_analysis": True,
+        "difficulty": "hard"
+    },
+
+    # === EDGE CASES (2 cases) ===
+    {
+        "id": "EC-001",
+        "query": "What was FAB's net profit in Q5 2023?",
+        "category": "edge_case",
+        "expected_behavior": "refuse",
+        "expected_response": "should clarify that Q5 doesn't exist",
+        "difficulty": "easy"
+    },
+    {
+        "id": "EC-002",
+        "query": "Compare FAB's performance with Emirates NBD in Q2 2023.",
+        "category": "edge_case", 
+        "expected_behavior": "refuse",
+        "expected_response": "should state it only has FAB data",
+        "difficulty": "easy"
+    }
+)
+
+# Report row templates, parsed once; "{:.50}" truncates the query to 50 characters
+_CATEGORY_ROW_FMT = "{:<20} {:>5.1f}% ({}/{})".format
+_RESULT_ROW_FMT = "{} {}: {:.50}...".format
+_ISSUE_ROW_FMT = "   ⚠️  {}".format
+
+def _result_rows(result: CaseResult) -> List[str]:
+    """Report lines for one test result: status line followed by any issues"""
+    rows = [_RESULT_ROW_FMT("✅" if result.status == "passed" else "❌", result.case["id"], result.case["query"])]
+    if result.evaluation is not None:
+        rows.extend(map(_ISSUE_ROW_FMT, result.evaluation["issues"]))
+    return rows
+
+class FinancialTestSuite:
+    def __init__(self, max_workers: int = TEST_PARALLELISM, use_cache: bool = True, cache_version: str = "",
+                 executor: str = TEST_EXECUTOR):
+        self.test_cases = _TEST_CASES
+        # Per-case requirements are fixed, so the checks' case-dependent branches are resolved here
+        self._plans: Dict[str, CheckPlan] = {tc["id"]: _compile_plan(tc) for tc in self.test_cases}
+        self.max_workers = max(1, max_workers)
+        self.executor = executor
+        # Re-runs and overlapping queries reuse earlier orchestrator responses
+        self.query_cache = QueryCache(version=cache_version) if use_cache else None
     
     def run_test_suite(self, orchestrator) -> Dict[str, Any]:
         """Run all test cases and return comprehensive results"""
@@ -224,137 +557,145 @@ class FinancialTestSuite:
             "metrics": {}
         }
         
-        for test_case in self.test_cases:
-            print(f"🧪 Running test {test_case['id']}: {test_case['query']}")
+        detailed_results = [None] * len(self.test_cases)
+        log = _BufferedLogger()
+        start_time = time.perf_counter()
+        try:
+            self._run_cases(orchestrator, results, detailed_results, log)
+            log.log(f"⏱️ {len(self.test_cases)} tests in {time.perf_counter() - start_time:.1f}s "
+                    f"({self.executor} executor, {self.max_workers} workers)")
+        finally:
+            log.close()
+        
+        # Keep the report in test-case order regardless of completion order
+        results["detailed_results"] = detailed_results
+        if self.query_cache is not None:
+            self.query_cache.save()
+        
+        # Calculate category breakdown
+        frame = self._results_frame(results["detailed_results"])
+        results["category_breakdown"] = self._calculate_category_breakdown(frame)
+        results["metrics"] = self._calculate_overall_metrics(frame)
+        
+        return results
+    
+    def _run_cases(self, orchestrator, results: Dict[str, Any], detailed_results: List[Optional[CaseResult]],
+                   log: _BufferedLogger):
+        """Run every case on the thread pool, filling detailed_results and the summary counters
+        
+        Threads always do cache lookups and evaluation; with the process executor
+        they hand only the query itself to a pre-warmed worker process.
+        """
+        with ExitStack() as stack:
+            if self.executor == "process":
+                processes = stack.enter_context(
+                    ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+                )
+                run_query = functools.partial(_process_query_in_pool, processes)
+            else:
+                # process_query builds a fresh WorkflowState per call, so threads share the orchestrator
+                run_query = orchestrator.process_query
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.max_workers))
             
-            try:
-                # Run the query through the orchestrator
-                test_result = self._run_single_test(test_case, orchestrator)
-                results["detailed_results"].append(test_result)
+            futures = {}
+            for index, test_case in enumerate(self.test_cases):
+                log.log(f"🧪 Running test {test_case['id']}: {test_case['query']}")
+                futures[executor.submit(self._run_single_test, test_case, run_query)] = index
+            
+            for future in as_completed(futures):
+                index = futures[future]
+                test_case = self.test_cases[index]
+                try:
+                    test_result = future.result()
+                except Exception as e:
+                    log.log(f"❌ Test {test_case['id']} crashed: {e}")
+                    test_result = CaseResult(test_case, "error", 0, error=str(e))
+                    results["summary"]["failed"] += 1
+                    detailed_results[index] = test_result
+                    continue
                 
-                if test_result["status"] == "passed":
+                if test_result.status == "passed":
                     results["summary"]["passed"] += 1
-                elif test_result["status"] == "failed":
+                elif test_result.status == "failed":
                     results["summary"]["failed"] += 1
                 else:
                     results["summary"]["skipped"] += 1
-                    
-            except Exception as e:
-                print(f"❌ Test {test_case['id']} crashed: {e}")
-                results["detailed_results"].append({
-                    **test_case,
-                    "status": "error",
-                    "error": str(e),
-                    "execution_time": 0
-                })
-                results["summary"]["failed"] += 1
-        
-        # Calculate category breakdown
-        results["category_breakdown"] = self._calculate_category_breakdown(results["detailed_results"])
-        results["metrics"] = self._calculate_overall_metrics(results)
-        
-        return results
+                detailed_results[index] = test_result
     
-    def _run_single_test(self, test_case: Dict[str, Any], orchestrator) -> Dict[str, Any]:
+    def _run_single_test(self, test_case: Dict[str, Any], run_query) -> CaseResult:
         """Run a single test case"""
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         try:
-            response = orchestrator.process_query(test_case["query"])
-            execution_time = (datetime.now() - start_time).total_seconds()
-            
-            # Convert FinancialDataPoint to dict for JSON serialization
-            if "data_points" in response:
-                response["data_points"] = [
-                    dp.dict() if hasattr(dp, 'dict') else dp 
-                    for dp in response["data_points"]
-                ]
+            response = self.query_cache.get(test_case["query"]) if self.query_cache is not None else None
+            cached = response is not None
+            if not cached:
+                response = run_query(test_case["query"])
+                if self.query_cache is not None:
+                    self.query_cache.put(test_case["query"], response)
+            execution_time = time.perf_counter() - start_time
             
             # Evaluate the response
             evaluation = self._evaluate_response(test_case, response)
             
-            return {
-                **test_case,
-                "status": "passed" if evaluation["passed"] else "failed",
-                "response": response,
-                "evaluation": evaluation,
-                "execution_time": execution_time
-            }
+            return CaseResult(
+                test_case,
+                "passed" if evaluation["passed"] else "failed",
+                execution_time,
+                response=response,
+                evaluation=evaluation,
+                cached=cached
+            )
             
         except Exception as e:
-            return {
-                **test_case,
-                "status": "error",
-                "error": str(e),
-                "execution_time": (datetime.now() - start_time).total_seconds()
-            }
+            return CaseResult(test_case, "error", time.perf_counter() - start_time, error=str(e))
     
     def _evaluate_response(self, test_case: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
         """Evaluate a response against test case expectations"""
-        evaluation = {
-            "passed": True,
-            "checks": [],
-            "issues": []
+        answer = response.get("answer")
+        passed, checks, issues = _evaluate_checks(
+            self._plans[test_case["id"]],
+            len(answer.strip()) if answer else 0,
+            len(response.get("data_points") or ()),
+            bool(response.get("calculations")),
+            response.get("confidence", 0)
+        )
+        return {
+            "passed": passed,
+            "checks": list(checks),
+            "issues": list(issues)
         }
-        
-        # Check if answer is provided
-        if not response.get("answer") or len(response["answer"].strip()) < 10:
-            evaluation["passed"] = False
-            evaluation["issues"].append("Answer is empty or too short")
-        
-        # Check data points were extracted
-        if test_case["category"] not in ["edge_case"]:
-            if not response.get("data_points"):
-                evaluation["passed"] = False
-                evaluation["issues"].append("No data points extracted")
-            else:
-                evaluation["checks"].append(f"Extracted {len(response['data_points'])} data points")
-        
-        # Check calculations if required
-        if test_case.get("requires_calculation") and not response.get("calculations"):
-            evaluation["passed"] = False
-            evaluation["issues"].append("No calculations performed for calculation-required query")
-        
-        # Check confidence score
-        confidence = response.get("confidence", 0)
-        if confidence < 0.5:
-            evaluation["issues"].append(f"Low confidence score: {confidence}")
-        
-        return evaluation
     
-    def _calculate_category_breakdown(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def _results_frame(results: List[CaseResult]) -> pd.DataFrame:
+        """Columnar view of the fields the aggregates need; responses stay out of the frame"""
+        return pd.DataFrame({
+            "category": [r.case["category"] for r in results],
+            "passed": [r.status == "passed" for r in results],
+            "execution_time": [r.execution_time for r in results],
+            "cached": [r.cached for r in results],
+        })
+    
+    def _calculate_category_breakdown(self, frame: pd.DataFrame) -> Dict[str, Any]:
         """Calculate performance by category"""
-        categories = {}
-        for result in results:
-            category = result["category"]
-            if category not in categories:
-                categories[category] = {"total": 0, "passed": 0}
-            
-            categories[category]["total"] += 1
-            if result["status"] == "passed":
-                categories[category]["passed"] += 1
-        
-        # Calculate percentages
-        for category in categories:
-            categories[category]["success_rate"] = (
-                categories[category]["passed"] / categories[category]["total"] * 100
-            )
-        
-        return categories
+        grouped = frame.groupby("category", sort=False)["passed"].agg(["size", "sum", "mean"])
+        return {
+            category: {
+                "total": int(row["size"]),
+                "passed": int(row["sum"]),
+                "success_rate": float(row["mean"]) * 100
+            }
+            for category, row in grouped.iterrows()
+        }
     
-    def _calculate_overall_metrics(self, results: Dict[str, Any]) -> Dict[str, float]:
+    def _calculate_overall_metrics(self, frame: pd.DataFrame) -> Dict[str, float]:
         """Calculate overall performance metrics"""
-        detailed_results = results["detailed_results"]
+        total_tests = len(frame)
+        passed_tests = int(frame["passed"].sum())
         
-        total_tests = len(detailed_results)
-        passed_tests = sum(1 for r in detailed_results if r["status"] == "passed")
-        
-        # Calculate average execution time for successful tests
-        successful_times = [
-            r["execution_time"] for r in detailed_results 
-            if r["status"] == "passed" and "execution_time" in r
-        ]
-        avg_execution_time = sum(successful_times) / len(successful_times) if successful_times else 0
+        # Calculate average execution time for successful tests (cache hits excluded)
+        successful_times = frame.loc[frame["passed"] & ~frame["cached"], "execution_time"].dropna()
+        avg_execution_time = float(successful_times.mean()) if len(successful_times) else 0
         
         return {
             "overall_accuracy": (passed_tests / total_tests) * 100,
@@ -364,7 +705,7 @@ class FinancialTestSuite:
     
     def generate_report(self, results: Dict[str, Any]) -> str:
         """Generate a comprehensive test report"""
-        report = [
+        header = (
             "=" * 60,
             "FAB FINANCIAL ANALYZER - TEST SUITE REPORT",
             "=" * 60,
@@ -377,40 +718,37 @@ class FinancialTestSuite:
             "",
             "CATEGORY BREAKDOWN:",
             "-" * 30
-        ]
-        
-        for category, stats in results["category_breakdown"].items():
-            report.append(
-                f"{category.upper():<20} {stats['success_rate']:>5.1f}% "
-                f"({stats['passed']}/{stats['total']})"
-            )
-        
-        report.extend([
-            "",
-            "DETAILED RESULTS:",
-            "-" * 30
-        ])
-        
-        for result in results["detailed_results"]:
-            status_icon = "✅" if result["status"] == "passed" else "❌"
-            report.append(f"{status_icon} {result['id']}: {result['query'][:50]}...")
-            if "evaluation" in result and result["evaluation"]["issues"]:
-                for issue in result["evaluation"]["issues"]:
-                    report.append(f"   ⚠️  {issue}")
-        
-        return "\n".join(report)
+        )
+        category_rows = (
+            _CATEGORY_ROW_FMT(category.upper(), stats["success_rate"], stats["passed"], stats["total"])
+            for category, stats in results["category_breakdown"].items()
+        )
+        return "\n".join(chain(
+            header,
+            category_rows,
+            ("", "DETAILED RESULTS:", "-" * 30),
+            chain.from_iterable(map(_result_rows, results["detailed_results"]))
+        ))
 
-def run_test_suite():
-    """Main function to run the test suite"""
+def run_test_suite(use_cache: bool = True):
+    """Main function to run the test suite
+    
+    With use_cache=False the persisted query cache is cleared first, so every
+    query runs through the orchestrator and the fresh responses are cached.
+    """
     from agents.orchestrator import OrchestratorAgent
+    from tools.document_retriever import get_vector_store
     
     print("🚀 Starting Comprehensive Test Suite...")
     
     # Initialize orchestrator
     orchestrator = OrchestratorAgent()
     
-    # Run test suite
-    test_suite = FinancialTestSuite()
+    # Run test suite; cached responses are dropped when the pipeline or the ingested data changed
+    cache_version = f"{orchestrator.VERSION}|{get_vector_store().data_fingerprint()}"
+    test_suite = FinancialTestSuite(cache_version=cache_version)
+    if not use_cache:
+        test_suite.query_cache.clear()
     results = test_suite.run_test_suite(orchestrator)
     
     # Generate and print report
@@ -418,8 +756,7 @@ def run_test_suite():
     print(report)
     
     # Save results to file
-    with open("evaluation/test_results.json", "w") as f:
-        json.dump(results, f, indent=2)
+    save_results(results, "evaluation/test_results.json")
     
     print("\n📊 Results saved to evaluation/test_results.json")
     
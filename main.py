@@ -6,15 +6,22 @@ Main entry point for the application
 
 import argparse
 import sys
+from functools import cached_property
 from pathlib import Path
 
 
 class FABFinancialAnalyzer:
-    def __init__(self):
+    # Agents and the vector store pull in langgraph/chromadb/torch; each is
+    # imported and built on first use only
+    @cached_property
+    def orchestrator(self):
         from agents.orchestrator import OrchestratorAgent
-        from data_processing.vector_store import FinancialVectorStore
-        self.orchestrator = OrchestratorAgent()
-        self.vector_store = FinancialVectorStore()
+        return OrchestratorAgent()
+    
+    @cached_property
+    def vector_store(self):
+        from tools.document_retriever import get_vector_store
+        return get_vector_store()
     
     def process_query(self, query: str):
         """Main method to process financial queries"""
@@ -88,11 +95,16 @@ def main():
         default="./data_raw",
         help="Directory containing raw PDF documents"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Test mode: clear cached orchestrator responses and re-run every query"
+    )
     
     args = parser.parse_args()
     
     if args.mode == "api":
-        from api.main import app
+        # uvicorn imports "api.main:app" itself in the reloader's worker process
         import uvicorn
         from config.settings import settings
         
@@ -117,7 +129,7 @@ def main():
     elif args.mode == "process-data":
         from data_processing.document_parser import FABDocumentParser
         from data_processing.chunking_strategy import FinancialChunkingStrategy
-        from data_processing.vector_store import FinancialVectorStore
+        from tools.document_retriever import get_vector_store
         import json
         
         print(" Processing financial documents...")
@@ -125,40 +137,48 @@ def main():
         # Initialize components
         parser = FABDocumentParser()
         chunker = FinancialChunkingStrategy()
-        vector_store = FinancialVectorStore()
+        vector_store = get_vector_store()
         
-        # Process all documents
-        all_chunks = []
+        # Each PDF is parsed, chunked and inserted before the next one is read,
+        # so embedding starts with the first file and parsed pages aren't held for the whole corpus
         data_dir = Path(args.data_dir)
         total_files = 0
         successful_files = 0
+        total_chunks = 0
+        successful_adds = 0
         
         for doc_category in ["Financial_Statements", "Earnings_Presentation", "Results_Call"]:
             category_path = data_dir / doc_category
-            if category_path.exists():
-                pdf_files = list(category_path.glob("FAB_*.pdf"))
-                print(f" Found {len(pdf_files)} PDFs in {doc_category}")
+            if not category_path.exists():
+                continue
+            print(f" Scanning {doc_category} for PDFs")
+            
+            for pdf_file in category_path.glob("FAB_*.pdf"):
+                total_files += 1
+                print(f" Processing {pdf_file.name}...")
+                try:
+                    parsed = parser.parse_financial_statement(str(pdf_file))
+                except Exception as e:
+                    print(f"    Error: {str(e)}")
+                    continue
+                if not parsed:
+                    print(f"     Warning: No chunks generated")
+                    continue
+                successful_files += 1
+                print(f"    Success: {len(parsed)} chunks")
                 
-                for pdf_file in pdf_files:
-                    total_files += 1
-                    print(f" Processing {pdf_file.name}...")
-                    try:
-                        chunks = parser.parse_financial_statement(str(pdf_file))
-                        if chunks:
-                            all_chunks.extend(chunks)
-                            successful_files += 1
-                            print(f"    Success: {len(chunks)} chunks")
-                        else:
-                            print(f"     Warning: No chunks generated")
-                    except Exception as e:
-                        print(f"    Error: {str(e)}")
+                final_chunks = chunker.create_section_chunks(parsed)
+                added = len(vector_store.add_documents_in_batches(final_chunks))
+                total_chunks += len(final_chunks)
+                successful_adds += added
+                print(f"    Added {added}/{len(final_chunks)} chunks to vector database")
         
         print(f"\n Processing Summary:")
         print(f"   Total files: {total_files}")
         print(f"   Successful: {successful_files}")
         print(f"   Failed: {total_files - successful_files}")
         
-        if not all_chunks:
+        if not successful_files:
             print("  CRITICAL: No chunks were generated from any PDF files!")
             print("  Possible solutions:")
             print("   1. Run debug_pdf_processing.py to diagnose the issue")
@@ -166,36 +186,16 @@ def main():
             print("   3. Try different PDF files")
             return
         
-        # Create intelligent chunks
-        print("Creating intelligent chunks...")
-        final_chunks = chunker.create_section_chunks(all_chunks)
-        print(f" Created {len(final_chunks)} final chunks")
-        
-        # Add to vector store
-        print("Adding to vector database...")
-        try:
-            vector_store.add_documents(final_chunks)
-            print(" Successfully added to vector database")
-        except Exception as e:
-            print(f" Error adding to vector database: {e}")
-            print(" Trying to add chunks individually...")
-            
-            # Try adding chunks one by one
-            successful_adds = 0
-            for chunk in final_chunks:
-                try:
-                    vector_store.add_documents([chunk])
-                    successful_adds += 1
-                except:
-                    continue
-            
-            print(f"   Partially added {successful_adds}/{len(final_chunks)} chunks")
+        if successful_adds == total_chunks:
+            print(f" Successfully added {total_chunks} chunks to vector database")
+        else:
+            print(f"   Partially added {successful_adds}/{total_chunks} chunks")
         
         # Save processing summary
         summary = {
             "total_files_processed": total_files,
             "successful_files": successful_files,
-            "total_chunks_created": len(final_chunks),
+            "total_chunks_created": total_chunks,
             "document_categories": ["Financial_Statements", "Earnings_Presentation", "Results_Call"]
         }
         
@@ -207,7 +207,7 @@ def main():
     elif args.mode == "test":
         from evaluation.test_suite import run_test_suite
         print(" Running test suite...")
-        run_test_suite()
+        run_test_suite(use_cache=not args.no_cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, validator 
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Dict, Any, Optional, Union
 from enum import Enum
+from types import MappingProxyType
 from datetime import datetime
 
 class DocumentType(str, Enum):
@@ -43,8 +44,9 @@ class DocumentMetadata(BaseModel):
     currency: str = "AED"
     units: str = "millions"
 
-    # PYDANTIC V1 SYNTAX
-    @validator('pages', pre=True)
+    # Pydantic v2: validation runs in the compiled pydantic-core
+    @field_validator('pages', mode='before')
+    @classmethod
     def validate_pages(cls, v):
         if v == "" or v is None:
             return None
@@ -81,10 +83,35 @@ class WorkflowState(BaseModel):
     query: str
     query_type: Optional[QueryType] = None
     current_step: str = "initial"
-    extracted_data: List[FinancialDataPoint] = []
-    intermediate_results: Dict[str, Any] = {}
-    calculations: List[Dict[str, Any]] = []
+    extracted_data: List[FinancialDataPoint] = Field(default_factory=list)
+    intermediate_results: Dict[str, Any] = Field(default_factory=dict)
+    calculations: List[Dict[str, Any]] = Field(default_factory=list)
     final_answer: Optional[str] = None
-    sources: List[Dict[str, str]] = []
+    sources: List[Dict[str, str]] = Field(default_factory=list)
     error: Optional[str] = None
-    iteration_count: int = 0
\ No newline at end of file
+    iteration_count: int = 0
+
+# Read-only value -> member tables for the per-data-point ingestion path;
+# a dict hit skips EnumMeta.__call__
+_METRIC_BY_VALUE = MappingProxyType({m.value: m for m in FinancialMetric})
+_QUARTER_BY_VALUE = MappingProxyType({q.value: q for q in Quarter})
+_DOCUMENT_TYPE_BY_VALUE = MappingProxyType({d.value: d for d in DocumentType})
+
+def metric_from_str(value: str) -> FinancialMetric:
+    """FinancialMetric for a value string; unknown values raise ValueError like FinancialMetric(value)"""
+    try:
+        return _METRIC_BY_VALUE[value]
+    except (KeyError, TypeError):
+        return FinancialMetric(value)
+
+def quarter_from_str(value: str) -> Quarter:
+    try:
+        return _QUARTER_BY_VALUE[value]
+    except (KeyError, TypeError):
+        return Quarter(value)
+
+def document_type_from_str(value: str) -> DocumentType:
+    try:
+        return _DOCUMENT_TYPE_BY_VALUE[value]
+    except (KeyError, TypeError):
+        return DocumentType(value)
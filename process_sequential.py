@@ -1,13 +1,27 @@
 # process_sequential.py
 import sys
+import os
+import argparse
+import re
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 import json
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent))
 
 from data_processing.document_parser import FABDocumentParser
-from data_processing.vector_store import FinancialVectorStore
+from data_processing.vector_store import ADD_BATCH_SIZE
+from tools.document_retriever import get_vector_store
+
+# Optional fast JSON encoder for the summary file
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # NEW: Import semantic chunking with fallback
 try:
@@ -15,14 +29,104 @@ try:
     SEMANTIC_CHUNKING_AVAILABLE = True
     print(" Semantic chunking available")
 except ImportError:
-    from data_processing.chunking_strategy import FinancialChunkingStrategy
     SEMANTIC_CHUNKING_AVAILABLE = False
     print("  Semantic chunking not available, using basic chunking")
 
+# Basic chunker, imported once for the fallback path
+try:
+    from data_processing.chunking_strategy import FinancialChunkingStrategy as _BasicChunker
+except ImportError:
+    _BasicChunker = None
+
+# PDFs parsed concurrently per folder; parsing is CPU-bound layout work per file
+PARSE_WORKERS = int(os.getenv("FAB_PARSE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Folders processed by default, in order
+DEFAULT_FOLDERS = ["Financial_Statements", "Earnings_Presentations", "Results_Calls", "Annual_Reports"]
+
+# Insert batches queued behind the writer thread before parsing waits on it
+MAX_PENDING_INSERTS = 2
+
+# Quarterly PDFs, and the annual reports kept in their own folder
+PDF_NAME_RE = re.compile(r"FAB_.*\.pdf")
+ANNUAL_REPORT_NAME_RE = re.compile(r"FAB_.*_Annual_Report\.pdf")
+
+def _list_pdfs(folder: Path, name_re) -> list:
+    """PDFs in folder whose name fully matches name_re, from one directory scan"""
+    with os.scandir(folder) as entries:
+        return sorted(Path(entry.path) for entry in entries
+                      if name_re.fullmatch(entry.name) and entry.is_file())
+
+# Parser and chunker of this process, built once by _init_parse_worker
+_PARSER = None
+_CHUNKER = None
+
+def _init_parse_worker():
+    global _PARSER, _CHUNKER
+    _PARSER = FABDocumentParser()
+    if SEMANTIC_CHUNKING_AVAILABLE:
+        # Files are already spread over processes, so each chunker stays single-process
+        _CHUNKER = SemanticFinancialChunking(metrics_extractor=_PARSER.table_metrics_extractor, parallel=False)
+    else:
+        _CHUNKER = _BasicChunker()
+
+def _parse_and_chunk(pdf_path: str):
+    """Parse and chunk one PDF; returns (chunks, error message or None)"""
+    if _PARSER is None:
+        _init_parse_worker()
+    try:
+        parsed = _PARSER.parse_financial_statement(pdf_path)
+        if not parsed:
+            return [], None
+        if SEMANTIC_CHUNKING_AVAILABLE:
+            return _CHUNKER.create_semantic_chunks(parsed), None
+        return _CHUNKER.create_section_chunks(parsed), None
+    except Exception as e:
+        return [], str(e)
+
+def _parse_files(pdf_files, executor=None):
+    """Yield (pdf_file, chunks, error) per PDF, across worker processes when worthwhile
+    
+    Uses the given parse pool, whose workers keep their parser and chunker
+    between folders, or else a pool of PARSE_WORKERS for this call only.
+    """
+    done = set()
+    workers = min(PARSE_WORKERS, len(pdf_files))
+    if executor is not None or workers > 1:
+        try:
+            with ExitStack() as stack:
+                if executor is None:
+                    executor = stack.enter_context(
+                        ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker)
+                    )
+                futures = {executor.submit(_parse_and_chunk, str(pdf_file)): pdf_file for pdf_file in pdf_files}
+                for future in as_completed(futures):
+                    pdf_file = futures[future]
+                    done.add(pdf_file)
+                    yield (pdf_file, *future.result())
+            return
+        except Exception as e:
+            print(f"    Parallel parsing unavailable, running sequentially: {e}")
+    
+    for pdf_file in pdf_files:
+        if pdf_file in done:
+            continue
+        print(f" Processing {pdf_file.name}...")
+        yield (pdf_file, *_parse_and_chunk(str(pdf_file)))
+
+def write_summary(summary: dict, path: str = "sequential_processing_summary.json"):
+    """Write summary as indented JSON via a temp file, so an interrupted run never leaves half a file"""
+    tmp_path = Path(f"{path}.tmp")
+    if ORJSON_AVAILABLE:
+        tmp_path.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    else:
+        tmp_path.write_text(json.dumps(summary, indent=2))
+    os.replace(tmp_path, path)
+
 def clear_vector_database():
     """Clear the vector database before processing to avoid duplicates"""
     try:
-        vector_store = FinancialVectorStore()
+        vector_store = get_vector_store()
         # ChromaDB doesn't have a direct clear() method, so we recreate collection
         vector_store.client.delete_collection(name=vector_store.collection.name)
         print("  Cleared existing vector database")
@@ -32,147 +136,228 @@ def clear_vector_database():
             name=vector_store.collection.name,
             metadata={"description": "FAB Financial Documents"}
         )
+        # Left unbuilt until the first search, so the bulk load doesn't also grow an HNSW graph
+        vector_store.drop_index()
         print(" Created fresh vector database")
         return vector_store
     except Exception as e:
         print(f"  Could not clear database: {e}")
-        return FinancialVectorStore()
+        return get_vector_store()
 
-def process_folder(folder_name, data_dir="./data_raw", vector_store=None):
-    """Process one folder at a time - ENHANCED WITH SEMANTIC CHUNKING"""
+def process_folder(folder_name, data_dir="./data_raw", vector_store=None, parse_pool=None,
+                   insert_pool=None, batch_size=ADD_BATCH_SIZE) -> Counter:
+    """Process one folder at a time - ENHANCED WITH SEMANTIC CHUNKING
+    
+    Chunks are inserted as soon as a batch's worth is pending. With an
+    insert_pool (a single writer thread), inserts overlap parsing and at most
+    MAX_PENDING_INSERTS batches wait on it. Returns chunk counts by chunk_type
+    for the chunks that were added.
+    """
     if vector_store is None:
-        vector_store = FinancialVectorStore()
+        vector_store = get_vector_store()
     
     print("=" * 50)
     print(f" PROCESSING: {folder_name}") 
     print("=" * 50)
     
-    parser = FABDocumentParser()
-    
     # ENHANCED: Use semantic chunking if available
     if SEMANTIC_CHUNKING_AVAILABLE:
-        chunker = SemanticFinancialChunking()
         print("    Using semantic chunking strategy")
     else:
-        from data_processing.chunking_strategy import FinancialChunkingStrategy
-        chunker = FinancialChunkingStrategy()
         print("    Using basic chunking strategy")
     
     category_path = Path(data_dir) / folder_name
     if not category_path.exists():
         print(f" Folder not found: {folder_name}")
-        return []
+        return Counter()
     
     # ENHANCED: Handle both quarterly and annual PDFs
     if folder_name == "Annual_Reports":
-        pdf_files = list(category_path.glob("FAB_*_Annual_Report.pdf"))
+        pdf_files = _list_pdfs(category_path, ANNUAL_REPORT_NAME_RE)
         print(f" Found {len(pdf_files)} annual reports")
     else:
-        pdf_files = list(category_path.glob("FAB_*.pdf"))
+        pdf_files = _list_pdfs(category_path, PDF_NAME_RE)
         print(f" Found {len(pdf_files)} PDF files")
     
-    all_chunks = []
+    pending = []
+    inserts = []
+    created = 0
+    added_counts = Counter()
     successful_files = 0
     
-    for pdf_file in pdf_files:
-        print(f" Processing {pdf_file.name}...")
-        try:
-            chunks = parser.parse_financial_statement(str(pdf_file))
-            if chunks:
-                # ENHANCED: Apply semantic chunking
-                final_chunks = chunker.create_semantic_chunks(chunks)
-                all_chunks.extend(final_chunks)
-                successful_files += 1
-                print(f"    {len(final_chunks)} semantic chunks created")
-            else:
-                print(f"     No chunks generated")
-        except Exception as e:
-            print(f"    Error: {e}")
+    def record(added):
+        added_counts.update(chunk.metadata.get("chunk_type") for chunk in added)
     
-    # Create intelligent chunks for this folder
-    if all_chunks:
-        print(f" Created {len(all_chunks)} total chunks for {folder_name}")
-        
-        # Add to vector store
-        print(f"Adding {folder_name} chunks to vector database...")
-        try:
-            vector_store.add_documents(all_chunks)
+    def flush():
+        batch = pending.copy()
+        pending.clear()
+        if insert_pool is None:
+            record(vector_store.add_documents_in_batches(batch, batch_size))
+            return
+        if len(inserts) >= MAX_PENDING_INSERTS:
+            record(inserts.pop(0).result())
+        inserts.append(insert_pool.submit(vector_store.add_documents_in_batches, batch, batch_size))
+    
+    # Parsing runs in worker processes; Chroma inserts stay in this process
+    for pdf_file, final_chunks, error in _parse_files(pdf_files, parse_pool):
+        if error:
+            print(f"    Error in {pdf_file.name}: {error}")
+        elif final_chunks:
+            pending.extend(final_chunks)
+            created += len(final_chunks)
+            successful_files += 1
+            print(f"    {pdf_file.name}: {len(final_chunks)} semantic chunks created")
+            if len(pending) >= batch_size:
+                flush()
+        else:
+            print(f"     {pdf_file.name}: No chunks generated")
+    
+    if pending:
+        flush()
+    for future in inserts:
+        record(future.result())
+    
+    if created:
+        added = sum(added_counts.values())
+        print(f" Created {created} total chunks for {folder_name}")
+        if added == created:
             print(f" Successfully added {folder_name} to vector database")
-            return all_chunks
-        except Exception as e:
-            print(f" Error adding {folder_name}: {e}")
-            # Try adding chunks individually
-            successful_adds = 0
-            for chunk in all_chunks:
-                try:
-                    vector_store.add_documents([chunk])
-                    successful_adds += 1
-                except:
-                    continue
-            print(f"     Partially added {successful_adds}/{len(all_chunks)} chunks")
-            return all_chunks[:successful_adds]  # Return only successful chunks
+        else:
+            print(f"     Partially added {added}/{created} chunks")
     
-    return []
+    return added_counts
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Process FAB PDFs into the vector database, one folder at a time")
+    db_group = parser.add_mutually_exclusive_group()
+    db_group.add_argument(
+        "--fresh-db",
+        action="store_true",
+        help="Clear the existing database and start fresh"
+    )
+    db_group.add_argument(
+        "--keep-db",
+        action="store_true",
+        help="Keep the existing database and add new documents"
+    )
+    parser.add_argument(
+        "--folders",
+        nargs="+",
+        default=DEFAULT_FOLDERS,
+        help="Folders under --data-dir to process, in order"
+    )
+    parser.add_argument(
+        "--data-dir",
+        default="./data_raw",
+        help="Directory containing raw PDF documents"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=ADD_BATCH_SIZE,
+        help="Chunks per vector database insert"
+    )
+    parser.add_argument(
+        "--no-prompt",
+        action="store_true",
+        help="Never ask between folders; implied when stdin is not a terminal"
+    )
+    return parser.parse_args(argv)
 
-def main():
-    # ENHANCED: Add Annual_Reports to the processing list
-    folders = ["Financial_Statements", "Earnings_Presentations", "Results_Calls", "Annual_Reports"]
-    all_final_chunks = []
-    total_files_processed = 0
+def main(argv=None):
+    args = parse_args(argv)
+    # Prompts need a human; cron jobs and parent processes get the flags' answers instead
+    interactive = not args.no_prompt and sys.stdin.isatty()
+    folders = args.folders
+    chunk_type_counts = Counter()
+    processed_folders = []
     
     print(" Starting Sequential Folder Processing with Semantic Chunking")
     print(" Folders to process:", ", ".join(folders))
     print(" Semantic chunking:", "Enabled" if SEMANTIC_CHUNKING_AVAILABLE else "Disabled")
     print("This will process one folder at a time to prevent memory issues.")
-    print("You can stop after any folder by pressing 'n' when prompted.")
+    if interactive:
+        print("You can stop after any folder by pressing 'n' when prompted.")
     
-    # Ask if user wants to clear the database first
-    print("\n  Database Options:")
-    print("1. Clear existing database and start fresh")
-    print("2. Keep existing database and add new documents")
-    db_choice = input("Choose option (1 or 2): ").strip()
+    if args.fresh_db:
+        db_choice = "1"
+    elif args.keep_db or not interactive:
+        db_choice = "2"
+    else:
+        # Ask if user wants to clear the database first
+        print("\n  Database Options:")
+        print("1. Clear existing database and start fresh")
+        print("2. Keep existing database and add new documents")
+        db_choice = input("Choose option (1 or 2): ").strip()
     
     if db_choice == "1":
         vector_store = clear_vector_database()
         print(" Starting with fresh database...")
     else:
-        vector_store = FinancialVectorStore()
+        vector_store = get_vector_store()
         print(" Adding to existing database...")
     
-    for i, folder in enumerate(folders):
-        chunks = process_folder(folder, vector_store=vector_store)
-        all_final_chunks.extend(chunks)
-        total_files_processed += len(chunks)
+    # One parse pool for every folder, so each worker builds its parser and chunker once
+    parse_pool = (
+        ProcessPoolExecutor(max_workers=PARSE_WORKERS, initializer=_init_parse_worker)
+        if PARSE_WORKERS > 1 else None
+    )
+    # Chroma has a single SQLite writer, so one thread writes while parsing continues
+    insert_pool = ThreadPoolExecutor(max_workers=1)
+    bulk_load = False
+    
+    try:
+        if db_choice == "1":
+            # A fresh database is rebuilt from the PDFs if the load dies, so skip per-insert
+            # journaling. PRAGMAs are per connection and Chroma pools one per thread, so
+            # they are set on the writer thread that performs every insert.
+            bulk_load = insert_pool.submit(vector_store.set_bulk_load_mode, True).result()
         
-        # Ask to continue or stop (except after last folder)
-        if i < len(folders) - 1:
-            print(f"\n⏸  Finished {folder}. {len(folders) - i - 1} folder(s) remaining.")
-            response = input("Continue to next folder? (y/n): ").strip().lower()
-            if response != 'y':
-                print(" Stopping as requested.")
-                break
-        else:
-            print(f"\n Processed all {len(folders)} folders!")
+        for i, folder in enumerate(folders):
+            chunk_type_counts.update(process_folder(folder, data_dir=args.data_dir, vector_store=vector_store,
+                                                    parse_pool=parse_pool, insert_pool=insert_pool,
+                                                    batch_size=args.batch_size))
+            processed_folders.append(folder)
+            
+            # Ask to continue or stop (except after last folder)
+            if i < len(folders) - 1:
+                print(f"\n⏸  Finished {folder}. {len(folders) - i - 1} folder(s) remaining.")
+                if not interactive:
+                    continue
+                response = input("Continue to next folder? (y/n): ").strip().lower()
+                if response != 'y':
+                    print(" Stopping as requested.")
+                    break
+            else:
+                print(f"\n Processed all {len(folders)} folders!")
+    finally:
+        # Also on errors and Ctrl-C: stop the parsers and restore crash-safe
+        # settings on the writer thread once its queued inserts are done
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+        if bulk_load:
+            insert_pool.submit(vector_store.set_bulk_load_mode, False).result()
+        insert_pool.shutdown()
     
     # Save processing summary
+    total_chunks = sum(chunk_type_counts.values())
     summary = {
-        "folders_processed": folders[:len(all_final_chunks)],
-        "total_chunks_created": len(all_final_chunks),
+        "folders_processed": processed_folders,
+        "total_chunks_created": total_chunks,
         "processing_mode": "sequential_with_semantic_chunking",
         "semantic_chunking_used": SEMANTIC_CHUNKING_AVAILABLE,
         "database_cleared": db_choice == "1",
         "chunk_types_created": {
-            "financial_tables": len([c for c in all_final_chunks if c.get("metadata", {}).get("chunk_type") == "financial_table"]),
-            "text_sections": len([c for c in all_final_chunks if c.get("metadata", {}).get("chunk_type") == "text_section"]),
-            "financial_metrics": len([c for c in all_final_chunks if c.get("metadata", {}).get("chunk_type") == "financial_metric"])
+            "financial_tables": chunk_type_counts["financial_table"],
+            "text_sections": chunk_type_counts["text_section"],
+            "financial_metrics": chunk_type_counts["financial_metric"]
         }
     }
     
-    with open("sequential_processing_summary.json", "w") as f:
-        json.dump(summary, f, indent=2)
+    write_summary(summary)
     
     print(f"\n Processing complete!")
-    print(f" Total chunks created: {len(all_final_chunks)}")
+    print(f" Total chunks created: {total_chunks}")
     print(f" Semantic chunking: {'Enabled' if SEMANTIC_CHUNKING_AVAILABLE else 'Disabled'}")
     print(f"  Chunk types:")
     print(f"   - Financial tables: {summary['chunk_types_created']['financial_tables']}")
@@ -188,7 +373,7 @@ def main():
         print(f" Database test successful: Found {len(test_results)} results for 'net profit'")
         
         # Test annual reports if processed
-        if "Annual_Reports" in folders[:len(all_final_chunks)]:
+        if "Annual_Reports" in processed_folders:
             annual_results = vector_store.search("annual report", n_results=2)
             print(f" Annual reports indexed: Found {len(annual_results)} annual report chunks")
             
@@ -1,10 +1,9 @@
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 from pathlib import Path
 
 # Configure the page
@@ -218,6 +217,43 @@ def render_sample_metrics():
                 unsafe_allow_html=True
             )
 
+# API calls, memoized across reruns
+@st.cache_resource
+def _session() -> requests.Session:
+    """Keep-alive session shared by every rerun, retrying transient failures"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _get_health(api_url: str) -> dict | None:
+    """Return the /health payload, or None when the API is unreachable"""
+    try:
+        response = _session().get(f"{api_url}/health", timeout=5)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _analyze(api_url: str, query: str, include_calculations: bool, include_sources: bool) -> dict:
+    """POST to /analyze; errors raise so they are never cached"""
+    response = _session().post(
+        f"{api_url}/analyze",
+        json={
+            "query": query,
+            "include_calculations": include_calculations,
+            "include_sources": include_sources
+        },
+        timeout=60
+    )
+    response.raise_for_status()
+    return response.json()
+
 # Main application
 def main():
     # Render header
@@ -230,19 +266,14 @@ def main():
     # Health check
     with st.sidebar:
         st.markdown("### 🔍 System Status")
-        try:
-            health_response = requests.get(f"{api_url}/health", timeout=5)
-            if health_response.status_code == 200:
-                health_data = health_response.json()
-                if health_data.get("status") == "healthy":
-                    st.success("✅ API Connected")
-                    st.metric("Documents in DB", health_data.get("documents_in_db", "N/A"))
-                else:
-                    st.warning("⚠️ API Degraded")
-            else:
-                st.error("❌ API Connection Failed")
-        except:
+        health_data = _get_health(api_url)
+        if health_data is None:
             st.error("❌ Cannot reach API")
+        elif health_data.get("status") == "healthy":
+            st.success("✅ API Connected")
+            st.metric("Documents in DB", health_data.get("documents_in_db", "N/A"))
+        else:
+            st.warning("⚠️ API Degraded")
     
     # Main content layout
     col1, col2 = st.columns([2, 1])
@@ -284,92 +315,83 @@ def main():
             if query:
                 with st.spinner("🔍 Analyzing financial data with AI agents..."):
                     try:
-                        # Call the API
-                        response = requests.post(
-                            f"{api_url}/analyze",
-                            json={
-                                "query": query,
-                                "include_calculations": include_calculations,
-                                "include_sources": include_sources
-                            },
-                            timeout=60
-                        )
+                        # Call the API (identical re-submits are served from cache)
+                        result = _analyze(api_url, query, include_calculations, include_sources)
                         
-                        if response.status_code == 200:
-                            result = response.json()
-                            
-                            # Display results
-                            st.success("✅ Analysis Complete!")
-                            
-                            # Main answer
-                            st.markdown("### 📋 Analysis Results")
-                            st.markdown(f'<div class="result-box">{result["answer"]}</div>', unsafe_allow_html=True)
-                            
-                            # Confidence indicator
-                            confidence = result["confidence"]
-                            st.progress(confidence)
-                            st.caption(f"Confidence Level: {confidence:.0%}")
+                        # Display results
+                        st.success("✅ Analysis Complete!")
+                        
+                        # Main answer
+                        st.markdown("### 📋 Analysis Results")
+                        st.markdown(f'<div class="result-box">{result["answer"]}</div>', unsafe_allow_html=True)
+                        
+                        # Confidence indicator
+                        confidence = result["confidence"]
+                        st.progress(confidence)
+                        st.caption(f"Confidence Level: {confidence:.0%}")
+                        
+                        # Calculations section
+                        if include_calculations and result["calculations"]:
+                            st.markdown("### 🧮 Detailed Calculations")
                             
-                            # Calculations section
-                            if include_calculations and result["calculations"]:
-                                st.markdown("### 🧮 Detailed Calculations")
+                            for calc in result["calculations"]:
+                                calc_type = calc.get('calculation_type', 'unknown')
                                 
-                                for calc in result["calculations"]:
-                                    calc_type = calc.get('calculation_type', 'unknown')
+                                if calc_type == 'percentage_change':
+                                    st.metric(
+                                        label="Percentage Change",
+                                        value=f"{calc['percentage_change']:+.1f}%",
+                                        delta=f"AED {calc['absolute_change']:,.0f}M",
+                                        delta_color="normal"
+                                    )
+                                elif calc_type == 'roe':
+                                    st.metric(
+                                        label="Return on Equity",
+                                        value=f"{calc['roe_percentage']:.1f}%"
+                                    )
+                                elif calc_type == 'trend_analysis':
+                                    # Create trend visualization (plotting libraries load on first use)
+                                    import pandas as pd
+                                    import plotly.express as px
                                     
-                                    if calc_type == 'percentage_change':
-                                        st.metric(
-                                            label="Percentage Change",
-                                            value=f"{calc['percentage_change']:+.1f}%",
-                                            delta=f"AED {calc['absolute_change']:,.0f}M",
-                                            delta_color="normal"
-                                        )
-                                    elif calc_type == 'roe':
-                                        st.metric(
-                                            label="Return on Equity",
-                                            value=f"{calc['roe_percentage']:.1f}%"
-                                        )
-                                    elif calc_type == 'trend_analysis':
-                                        # Create trend visualization
-                                        df = pd.DataFrame({
-                                            'Period': calc['periods'],
-                                            'Value': calc['values']
-                                        })
-                                        
-                                        fig = px.line(
-                                            df, 
-                                            x='Period', 
-                                            y='Value',
-                                            title=f"{calc.get('metric', 'Metric').replace('_', ' ').title()} Trend",
-                                            markers=True,
-                                            color_discrete_sequence=['#1e3c72']
-                                        )
-                                        fig.update_layout(
-                                            plot_bgcolor='rgba(0,0,0,0)',
-                                            paper_bgcolor='rgba(0,0,0,0)',
-                                        )
-                                        st.plotly_chart(fig, use_container_width=True)
-                            
-                            # Data points
-                            if result["data_points"]:
-                                st.markdown("### 📊 Extracted Financial Data")
-                                df_data = pd.DataFrame([
-                                    {
-                                        'Metric': dp['metric'].replace('_', ' ').title(),
-                                        'Value (AED M)': f"{dp['value']:,.0f}",
-                                        'Period': dp['period'],
-                                        'Source': f"{dp['metadata']['document_type']} {dp['metadata']['year']} {dp['metadata']['quarter']}"
-                                    }
-                                    for dp in result["data_points"]
-                                ])
-                                st.dataframe(df_data, use_container_width=True)
+                                    df = pd.DataFrame({
+                                        'Period': calc['periods'],
+                                        'Value': calc['values']
+                                    })
+                                    
+                                    fig = px.line(
+                                        df, 
+                                        x='Period', 
+                                        y='Value',
+                                        title=f"{calc.get('metric', 'Metric').replace('_', ' ').title()} Trend",
+                                        markers=True,
+                                        color_discrete_sequence=['#1e3c72']
+                                    )
+                                    fig.update_layout(
+                                        plot_bgcolor='rgba(0,0,0,0)',
+                                        paper_bgcolor='rgba(0,0,0,0)',
+                                    )
+                                    st.plotly_chart(fig, use_container_width=True)
+                        
+                        # Data points
+                        if result["data_points"]:
+                            st.markdown("### 📊 Extracted Financial Data")
+                            import pandas as pd
                             
-                            # Processing time
-                            st.caption(f"⏱️ Processing time: {result['processing_time']:.2f} seconds")
+                            dps = result["data_points"]
+                            df_data = pd.DataFrame({
+                                'Metric': [dp['metric'].replace('_', ' ').title() for dp in dps],
+                                'Value (AED M)': [f"{dp['value']:,.0f}" for dp in dps],
+                                'Period': [dp['period'] for dp in dps],
+                                'Source': [f"{dp['metadata']['document_type']} {dp['metadata']['year']} {dp['metadata']['quarter']}" for dp in dps]
+                            })
+                            st.dataframe(df_data, use_container_width=True)
                         
-                        else:
-                            st.error(f"❌ API Error: {response.status_code} - {response.text}")
+                        # Processing time
+                        st.caption(f"⏱️ Processing time: {result['processing_time']:.2f} seconds")
                     
+                    except requests.exceptions.HTTPError as e:
+                        st.error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
                     except requests.exceptions.Timeout:
                         st.error("⏰ Request timed out. The analysis is taking longer than expected.")
                     except Exception as e:
@@ -407,13 +429,10 @@ def main():
         # Quick actions
         st.markdown("### ⚡ Quick Actions")
         if st.button("🔄 Test Connection", use_container_width=True):
-            try:
-                response = requests.get(f"{api_url}/health", timeout=5)
-                if response.status_code == 200:
-                    st.success("✅ Connection successful!")
-                else:
-                    st.error("❌ Connection failed")
-            except:
+            _get_health.clear()
+            if _get_health(api_url) is not None:
+                st.success("✅ Connection successful!")
+            else:
                 st.error("❌ Cannot connect to API")
         
         if st.button("📊 View API Docs", use_container_width=True):
@@ -0,0 +1,64 @@
+import threading
+
+import numpy as np
+import pytest
+
+vector_store = pytest.importorskip("data_processing.vector_store")
+
+from data_processing.chunk import Chunk
+from models.schemas import DocumentMetadata, DocumentType, Quarter
+
+
+class _RecordingCollection:
+    def __init__(self):
+        self.added = []
+
+    def add(self, documents, embeddings, metadatas, ids):
+        self.added.extend(metadatas)
+
+    def count(self):
+        return len(self.added)
+
+
+class _ConstantModel:
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+
+def _store():
+    # Skips the Chroma client and embedding model load; add_documents only needs these
+    store = vector_store.FinancialVectorStore.__new__(vector_store.FinancialVectorStore)
+    store.data_version = 0
+    store.collection = _RecordingCollection()
+    store.embedding_model = _ConstantModel()
+    store._index_lock = threading.RLock()
+    store.drop_index()
+    return store
+
+
+def test_add_documents_accepts_parser_metadata():
+    metadata = DocumentMetadata(
+        year=2023,
+        quarter=Quarter.Q1,
+        document_type=DocumentType.FINANCIAL_STATEMENT,
+        document_category="financial_statement",
+        file_path="FAB_Q1_2023_Financial_Statement.pdf"
+    )
+    chunk = Chunk(
+        content="Profit for the period AED 4,512 million",
+        metadata={**metadata.model_dump(), "chunk_type": "text_section", "metrics_found": ["net_profit"]}
+    )
+
+    added = _store().add_documents_in_batches([chunk])
+
+    assert added == [chunk]
+
+
+def test_clean_metadata_stores_enum_values_as_plain_strings():
+    cleaned = _store()._clean_metadata({"quarter": Quarter.Q1, "document_type": DocumentType.ANNUAL_REPORT})
+
+    assert cleaned == {"quarter": "Q1", "document_type": "annual_report"}
+    assert all(type(value) is str for value in cleaned.values())
@@ -1,18 +1,93 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import math
+from collections import deque
+from functools import lru_cache
+import numpy as np
 from models.schemas import FinancialDataPoint
 
+# Optional JIT for the trend loop
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _trend_core(values: np.ndarray) -> Tuple[float, int, int, np.ndarray, float]:
+    """One pass over values: (mean, first argmin, first argmax, growth rates %, average growth)"""
+    n = values.shape[0]
+    total = values[0]
+    min_idx = 0
+    max_idx = 0
+    growth_rates = np.zeros(n - 1)
+    growth_total = 0.0
+    for i in range(1, n):
+        value = values[i]
+        total += value
+        if value < values[min_idx]:
+            min_idx = i
+        if value > values[max_idx]:
+            max_idx = i
+        previous = values[i - 1]
+        if previous != 0:
+            growth_rates[i - 1] = (value - previous) / previous * 100
+            growth_total += growth_rates[i - 1]
+    return total / n, min_idx, max_idx, growth_rates, growth_total / (n - 1)
+
+if NUMBA_AVAILABLE:
+    # cache=True keeps the compiled loop on disk, so only the first process pays for compilation
+    _trend_core = njit(cache=True)(_trend_core)
+
+# Series shorter than this (a few years of quarters) use the NumPy path, which
+# has no JIT dispatch or cache-load cost
+TREND_JIT_MIN_LEN = 64
+
+def _trend_numpy(values: np.ndarray) -> Tuple[float, int, int, np.ndarray, float]:
+    """Vectorized equivalent of _trend_core"""
+    previous = values[:-1]
+    diffs = np.diff(values)
+    growth_rates = np.zeros_like(diffs)
+    nonzero = previous != 0
+    growth_rates[nonzero] = diffs[nonzero] / previous[nonzero] * 100
+    return values.mean(), int(values.argmin()), int(values.argmax()), growth_rates, growth_rates.mean()
+
+# Most recent results kept in calculation_history; older ones are dropped
+CALCULATION_HISTORY_SIZE = 1000
+
+# Distinct (numerator, denominator) pairs memoized by the ratio math below
+CALCULATION_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=CALCULATION_CACHE_SIZE)
+def _percentage(numerator: float, denominator: float) -> float:
+    return numerator / denominator * 100
+
+@lru_cache(maxsize=CALCULATION_CACHE_SIZE)
+def _percentage_change(old_value: float, new_value: float) -> Tuple[float, float]:
+    """(absolute change, percentage change)"""
+    change = new_value - old_value
+    return change, change / old_value * 100
+
 class FinancialCalculator:
     def __init__(self):
-        self.calculation_history = []
+        self.calculation_history = deque(maxlen=CALCULATION_HISTORY_SIZE)
+    
+    def _ratio(self, numerator: float, denominator: float, kind: str,
+               numerator_key: str, denominator_key: str, percentage_key: str) -> Dict[str, Any]:
+        """numerator / denominator as a percentage, recorded in the history"""
+        result = {
+            numerator_key: numerator,
+            denominator_key: denominator,
+            percentage_key: _percentage(numerator, denominator),
+            "calculation_type": kind
+        }
+        self.calculation_history.append(result)
+        return result
     
     def calculate_percentage_change(self, old_value: float, new_value: float) -> Dict[str, Any]:
         """Calculate percentage change between two values"""
         if old_value == 0:
             return {"error": "Cannot calculate percentage change from zero"}
         
-        change = new_value - old_value
-        percentage = (change / old_value) * 100
+        change, percentage = _percentage_change(old_value, new_value)
         
         result = {
             "old_value": old_value,
@@ -29,81 +104,43 @@ class FinancialCalculator:
         """Calculate Return on Equity"""
         if shareholder_equity == 0:
             return {"error": "Cannot calculate ROE with zero equity"}
-        
-        roe = (net_income / shareholder_equity) * 100
-        
-        result = {
-            "net_income": net_income,
-            "shareholder_equity": shareholder_equity,
-            "roe_percentage": roe,
-            "calculation_type": "roe"
-        }
-        
-        self.calculation_history.append(result)
-        return result
+        return self._ratio(net_income, shareholder_equity, "roe",
+                           "net_income", "shareholder_equity", "roe_percentage")
     
     def calculate_loan_to_deposit(self, total_loans: float, total_deposits: float) -> Dict[str, Any]:
         """Calculate Loan-to-Deposit Ratio"""
         if total_deposits == 0:
             return {"error": "Cannot calculate LDR with zero deposits"}
-        
-        ldr = (total_loans / total_deposits) * 100
-        
-        result = {
-            "total_loans": total_loans,
-            "total_deposits": total_deposits,
-            "ldr_percentage": ldr,
-            "calculation_type": "loan_to_deposit_ratio"
-        }
-        
-        self.calculation_history.append(result)
-        return result
+        return self._ratio(total_loans, total_deposits, "loan_to_deposit_ratio",
+                           "total_loans", "total_deposits", "ldr_percentage")
     
     def calculate_nim(self, net_interest_income: float, earning_assets: float) -> Dict[str, Any]:
         """Calculate Net Interest Margin"""
         if earning_assets == 0:
             return {"error": "Cannot calculate NIM with zero earning assets"}
-        
-        nim = (net_interest_income / earning_assets) * 100
-        
-        result = {
-            "net_interest_income": net_interest_income,
-            "earning_assets": earning_assets,
-            "nim_percentage": nim,
-            "calculation_type": "net_interest_margin"
-        }
-        
-        self.calculation_history.append(result)
-        return result
+        return self._ratio(net_interest_income, earning_assets, "net_interest_margin",
+                           "net_interest_income", "earning_assets", "nim_percentage")
     
     def calculate_trend(self, values: List[float], periods: List[str]) -> Dict[str, Any]:
         """Calculate trend analysis over multiple periods"""
         if len(values) < 2:
             return {"error": "Need at least 2 values for trend analysis"}
         
-        # Calculate basic statistics
-        mean = sum(values) / len(values)
-        min_val = min(values)
-        max_val = max(values)
-        min_period = periods[values.index(min_val)]
-        max_period = periods[values.index(max_val)]
-        
-        # Calculate growth rates
-        growth_rates = []
-        for i in range(1, len(values)):
-            growth = ((values[i] - values[i-1]) / values[i-1]) * 100 if values[i-1] != 0 else 0
-            growth_rates.append(growth)
+        # Statistics and growth rates in a single pass
+        array = np.asarray(values, dtype=np.float64)
+        core = _trend_core if NUMBA_AVAILABLE and len(array) >= TREND_JIT_MIN_LEN else _trend_numpy
+        mean, min_idx, max_idx, growth_rates, average_growth = core(array)
         
         result = {
             "periods": periods,
             "values": values,
-            "mean": mean,
-            "min_value": min_val,
-            "min_period": min_period,
-            "max_value": max_val,
-            "max_period": max_period,
-            "growth_rates": growth_rates,
-            "average_growth": sum(growth_rates) / len(growth_rates) if growth_rates else 0,
+            "mean": float(mean),
+            "min_value": values[min_idx],
+            "min_period": periods[min_idx],
+            "max_value": values[max_idx],
+            "max_period": periods[max_idx],
+            "growth_rates": growth_rates.tolist(),
+            "average_growth": float(average_growth),
             "calculation_type": "trend_analysis"
         }
         
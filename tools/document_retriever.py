@@ -1,16 +1,169 @@
 # tools/document_retriever.py
-from typing import List, Dict, Any, Optional
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from data_processing.vector_store import FinancialVectorStore
 from models.schemas import DocumentType
 
+# Searches remembered per retriever, keyed by (query, filters, n_results)
+RETRIEVAL_CACHE_SIZE = 512
+# Cosine similarity above which a reworded query reuses a cached search
+RETRIEVAL_SIMILARITY_THRESHOLD = 0.95
+
+_NUMBER_RE = re.compile(r"\d+")
+
+# One vector store per process, opened on first use and shared by every retriever
+_VECTOR_STORE = None
+_VECTOR_STORE_LOCK = threading.Lock()
+
+def get_vector_store() -> FinancialVectorStore:
+    """Return the shared FinancialVectorStore, opening it once (thread-safe)
+    
+    Every consumer goes through this, so the process holds one in-memory index.
+    """
+    global _VECTOR_STORE
+    if _VECTOR_STORE is None:
+        with _VECTOR_STORE_LOCK:
+            if _VECTOR_STORE is None:
+                _VECTOR_STORE = FinancialVectorStore()
+    return _VECTOR_STORE
+
+# typed: Quarter.Q1 == "Q1", but the two format differently
+@lru_cache(maxsize=1024, typed=True)
+def _query_from_filters(year, quarter, document_type, section_type) -> str:
+    query_parts = []
+    
+    if year is not None:
+        query_parts.append(f"{year}")
+    if quarter is not None:
+        query_parts.append(f"{quarter} quarter")
+    if document_type is not None:
+        query_parts.append(f"{document_type} report")
+    if section_type is not None:
+        query_parts.append(f"{section_type} section")
+    
+    return " ".join(query_parts) if query_parts else "financial performance"
+
+class RetrievalCache:
+    """LRU cache of vector store searches with an embedding-similarity fallback
+    
+    A near match only counts for the same filters and n_results, and when both
+    queries mention the same numbers ("2022 Q1" never answers for "2023 Q1").
+    Entries are tied to the store's data_version and dropped once it changes.
+    """
+    
+    def __init__(self, maxsize: int = RETRIEVAL_CACHE_SIZE,
+                 similarity_threshold: float = RETRIEVAL_SIMILARITY_THRESHOLD):
+        self.maxsize = maxsize
+        self.similarity_threshold = similarity_threshold
+        # (query, filters key, n_results) -> (unit embedding, results)
+        self._entries: "OrderedDict[Tuple, Tuple[np.ndarray, List[Dict[str, Any]]]]" = OrderedDict()
+        self._matrix = None
+        self._matrix_keys: List[Tuple] = []
+        self._data_version = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(query: str, filters: Optional[Dict], n_results: int) -> Tuple:
+        return query, tuple(sorted(filters.items())) if filters else None, n_results
+    
+    def get_exact(self, key: Tuple, data_version: int) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            self._check_version(data_version)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def get_similar(self, key: Tuple, embedding: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            matrix, keys = self._similarity_matrix()
+            if matrix is None:
+                return None
+            similarities = matrix @ embedding
+            numbers = _NUMBER_RE.findall(key[0])
+            for best in np.argsort(similarities)[::-1]:
+                if similarities[best] < self.similarity_threshold:
+                    return None
+                match = keys[best]
+                if match[1:] == key[1:] and _NUMBER_RE.findall(match[0]) == numbers and match in self._entries:
+                    self._entries.move_to_end(match)
+                    return self._entries[match][1]
+            return None
+    
+    def put(self, key: Tuple, embedding: np.ndarray, results: List[Dict[str, Any]], data_version: int):
+        with self._lock:
+            self._check_version(data_version)
+            self._entries[key] = (embedding, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def _check_version(self, data_version: int):
+        if data_version != self._data_version:
+            self._entries.clear()
+            self._matrix = None
+            self._data_version = data_version
+    
+    def _similarity_matrix(self):
+        """Stacked unit embeddings of cached queries, rebuilt only after a put"""
+        if self._matrix is None and self._entries:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([embedding for embedding, _ in self._entries.values()])
+        return self._matrix, self._matrix_keys
+
 class DocumentRetriever:
     def __init__(self):
-        self.vector_store = FinancialVectorStore()
+        self.vector_store = get_vector_store()
+        self.cache = RetrievalCache()
     
     def retrieve_relevant_documents(self, query: str, filters: Optional[Dict] = None, 
                                   n_results: int = 5) -> List[Dict[str, Any]]:
         """Retrieve relevant documents based on query and filters"""
-        return self.vector_store.search(query, filters, n_results)
+        return self._search(query, filters, n_results)
+    
+    def _search(self, query: str, filters: Optional[Dict], n_results: int) -> List[Dict[str, Any]]:
+        """vector_store.search through the retrieval cache; callers get their own result list"""
+        return self._search_many([query], [filters], n_results)[0]
+    
+    def _search_many(self, queries: List[str], filters_list: List[Optional[Dict]],
+                     n_results: int) -> List[List[Dict[str, Any]]]:
+        """Cached searches for several (query, filters) pairs; misses share one embedding pass"""
+        data_version = self.vector_store.data_version
+        keys = [RetrievalCache.make_key(query, filters, n_results) for query, filters in zip(queries, filters_list)]
+        results = [self.cache.get_exact(key, data_version) for key in keys]
+        
+        misses = [i for i, cached in enumerate(results) if cached is None]
+        if misses:
+            # Embed once: the vectors are both similarity-cache keys and search inputs
+            query_embeddings = self.vector_store._embed([queries[i] for i in misses])
+            embeddings = np.asarray(query_embeddings, dtype=np.float32)
+            
+            to_search = []
+            for i, query_embedding, embedding in zip(misses, query_embeddings, embeddings):
+                results[i] = self.cache.get_similar(keys[i], embedding)
+                if results[i] is None:
+                    to_search.append((i, query_embedding, embedding))
+            
+            if to_search:
+                found = self.vector_store.search_batch(
+                    [queries[i] for i, _, _ in to_search],
+                    [filters_list[i] for i, _, _ in to_search],
+                    n_results,
+                    query_embeddings=[query_embedding for _, query_embedding, _ in to_search]
+                )
+                for (i, _, embedding), docs in zip(to_search, found):
+                    self.cache.put(keys[i], embedding, docs, data_version)
+                    results[i] = docs
+        
+        return [list(docs) for docs in results]
     
     def retrieve_by_metadata(self, year: Optional[int] = None, 
                            quarter: Optional[str] = None,
@@ -18,6 +171,16 @@ class DocumentRetriever:
                            section_type: Optional[str] = None,
                            n_results: int = 10) -> List[Dict[str, Any]]:
         """Retrieve documents by specific metadata filters"""
+        filters = self._metadata_filters(year, quarter, document_type, section_type)
+        
+        # Use a generic query that matches the filters
+        query_text = self._build_query_from_filters(filters)
+        
+        return self._search(query_text, filters, n_results)
+    
+    def _metadata_filters(self, year: Optional[int] = None, quarter: Optional[str] = None,
+                          document_type: Optional[DocumentType] = None,
+                          section_type: Optional[str] = None) -> Dict[str, Any]:
         filters = {}
         
         if year:
@@ -29,39 +192,38 @@ class DocumentRetriever:
         if section_type:
             filters["section_type"] = section_type
         
-        # Use a generic query that matches the filters
-        query_text = self._build_query_from_filters(filters)
-        
-        return self.vector_store.search(query_text, filters, n_results)
+        return filters
     
     def _build_query_from_filters(self, filters: Dict) -> str:
         """Build a query string from metadata filters"""
-        query_parts = []
-        
-        if "year" in filters:
-            query_parts.append(f"{filters['year']}")
-        if "quarter" in filters:
-            query_parts.append(f"{filters['quarter']} quarter")
-        if "document_type" in filters:
-            query_parts.append(f"{filters['document_type']} report")
-        if "section_type" in filters:
-            query_parts.append(f"{filters['section_type']} section")
-        
-        return " ".join(query_parts) if query_parts else "financial performance"
+        return _query_from_filters(
+            filters.get("year"),
+            filters.get("quarter"),
+            filters.get("document_type"),
+            filters.get("section_type")
+        )
     
     def retrieve_for_temporal_analysis(self, periods: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Retrieve documents for temporal analysis across multiple periods"""
-        all_documents = []
-        
-        for period in periods:
-            docs = self.retrieve_by_metadata(
-                year=period.get("year"),
-                quarter=period.get("quarter"),
-                n_results=3
-            )
-            all_documents.extend(docs)
+        filters_list = [
+            self._metadata_filters(year=period.get("year"), quarter=period.get("quarter"))
+            for period in periods
+        ]
+        queries = [self._build_query_from_filters(filters) for filters in filters_list]
         
-        return all_documents
+        return list(chain.from_iterable(self._search_many(queries, filters_list, n_results=3)))
+    
+    # Async variants run the blocking embedding + search on a worker thread, so
+    # an event loop can overlap retrieval with other I/O
+    async def aretrieve_relevant_documents(self, query: str, filters: Optional[Dict] = None,
+                                           n_results: int = 5) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.retrieve_relevant_documents, query, filters, n_results)
+    
+    async def aretrieve_for_temporal_analysis(self, periods: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.retrieve_for_temporal_analysis, periods)
+    
+    async def aretrieve_risk_documents(self, n_results: int = 8) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.retrieve_risk_documents, n_results)
     
     def retrieve_risk_documents(self, n_results: int = 8) -> List[Dict[str, Any]]:
         """Retrieve documents likely containing risk information"""
@@ -71,22 +233,17 @@ class DocumentRetriever:
             "risk assessment mitigation control"
         ]
         
-        all_risk_docs = []
+        # chunk_id -> doc, first occurrence wins; stop querying once n_results are collected
+        unique_docs = {}
         for query in risk_queries:
             docs = self.retrieve_relevant_documents(
                 query, 
                 filters={"section_type": "risk_management"},
                 n_results=3
             )
-            all_risk_docs.extend(docs)
-        
-        # Remove duplicates by chunk_id
-        seen_ids = set()
-        unique_docs = []
-        for doc in all_risk_docs:
-            chunk_id = doc["metadata"].get("chunk_id")
-            if chunk_id not in seen_ids:
-                seen_ids.add(chunk_id)
-                unique_docs.append(doc)
+            for doc in docs:
+                unique_docs.setdefault(doc["metadata"].get("chunk_id"), doc)
+                if len(unique_docs) >= n_results:
+                    return list(unique_docs.values())
         
-        return unique_docs[:n_results]
\ No newline at end of file
+        return list(unique_docs.values())
\ No newline at end of file
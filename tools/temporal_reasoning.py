@@ -1,96 +1,117 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import re
 from models.schemas import Quarter
 
+# All period reference forms in one pattern, so text is scanned once. Each
+# alternative is a named group with <name>_y (year) and, if quarterly,
+# <name>_q (quarter) sub-groups. "<year> annual" is tried before
+# "<year> <word> quarter" so "2022 annual quarter" isn't read as quarter "annual"
+PERIOD_PATTERN = re.compile(r"""
+     (?P<qy>(?P<qy_q>Q[1-4])\s*(?P<qy_y>\d{4}))
+    |(?P<yq>(?P<yq_y>\d{4})\s*(?P<yq_q>Q[1-4]))
+    |(?P<wq>(?P<wq_q>\w+)\s*quarter\s*(?P<wq_y>\d{4}))
+    |(?P<ya>(?P<ya_y>\d{4})\s*annual)  # NEW: Annual pattern
+    |(?P<yw>(?P<yw_y>\d{4})\s*(?P<yw_q>\w+)\s*quarter)
+    |(?P<ay>annual\s*(?P<ay_y>\d{4}))  # NEW: Annual pattern
+""", re.IGNORECASE | re.VERBOSE)
+
+# Preference between forms when text holds several (quarterly before annual)
+PERIOD_FORM_RANK = {"qy": 0, "yq": 1, "wq": 2, "yw": 3, "ya": 4, "ay": 5}
+
+# Quarter number (1-4) -> Quarter
+QUARTERS_BY_NUMBER = {1: Quarter.Q1, 2: Quarter.Q2, 3: Quarter.Q3, 4: Quarter.Q4}
+QUARTER_NUMBERS = {quarter: number for number, quarter in QUARTERS_BY_NUMBER.items()}
+
+# (start, end) month-day of each quarter, indexed by quarter number - 1, annual last
+QUARTER_DATE_RANGES = (
+    ("01-01", "03-31"),
+    ("04-01", "06-30"),
+    ("07-01", "09-30"),
+    ("10-01", "12-31"),
+    ("01-01", "12-31"),
+)
+ANNUAL_RANGE_INDEX = 4
+
+def _period_index(year: int, quarter: Quarter) -> int:
+    """Quarters since year 0, so period distances are plain subtraction"""
+    return year * 4 + QUARTER_NUMBERS[quarter] - 1
+
 class TemporalReasoningTool:
-    def __init__(self):
-        self.quarter_map = {
-            "Q1": ("01-01", "03-31"),
-            "Q2": ("04-01", "06-30"),
-            "Q3": ("07-01", "09-30"),
-            "Q4": ("10-01", "12-31"),
-            "Annual": ("01-01", "12-31")
-        }
+    def date_range(self, quarter: Quarter) -> Tuple[str, str]:
+        """(start, end) month-day of a quarter, or of the whole year for Quarter.ANNUAL"""
+        if quarter == Quarter.ANNUAL:
+            return QUARTER_DATE_RANGES[ANNUAL_RANGE_INDEX]
+        return QUARTER_DATE_RANGES[QUARTER_NUMBERS[quarter] - 1]
     
     def parse_period_reference(self, text: str) -> Optional[Dict[str, Any]]:
         """Parse temporal references from text - ENHANCED FOR ANNUAL"""
-        patterns = [
-            r"(Q[1-4])\s*(\d{4})",
-            r"(\d{4})\s*(Q[1-4])", 
-            r"(\w+)\s*quarter\s*(\d{4})",
-            r"(\d{4})\s*(\w+)\s*quarter",
-            r"(\d{4})\s*annual",  # NEW: Annual pattern
-            r"annual\s*(\d{4})",  # NEW: Annual pattern
-        ]
+        # Only the first occurrence of each form is considered, and the
+        # best-ranked form that parses wins. Matches may overlap, so an
+        # unparseable "<word> quarter <year>" can't hide a later "<year> Q3"
+        best, best_rank = None, len(PERIOD_FORM_RANK)
+        seen_forms = set()
+        match = PERIOD_PATTERN.search(text)
+        while match is not None:
+            form = match.lastgroup
+            next_match = PERIOD_PATTERN.search(text, match.start() + 1)
+            rank = PERIOD_FORM_RANK[form]
+            if form not in seen_forms and rank < best_rank:
+                seen_forms.add(form)
+                period = self._period_from_match(match, form)
+                if period is not None:
+                    best, best_rank = period, rank
+                    if rank == 0:
+                        break
+            match = next_match
+        
+        return best
+    
+    def _period_from_match(self, match: re.Match, form: str) -> Optional[Dict[str, Any]]:
+        year = int(match.group(f"{form}_y"))
         
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                groups = match.groups()
-                
-                # Handle annual patterns
-                if "annual" in pattern:
-                    year_str = groups[0] if groups[0].isdigit() else groups[1]
-                    try:
-                        year = int(year_str)
-                        return {
-                            "year": year,
-                            "quarter": Quarter.ANNUAL,
-                            "period": f"{year}_Annual",
-                            "confidence": 0.9
-                        }
-                    except ValueError:
-                        continue
-                
-                # Handle quarterly patterns (existing code)
-                if len(groups) == 2:
-                    quarter_str = groups[0] if groups[0].upper().startswith('Q') else groups[1]
-                    year_str = groups[1] if groups[0].upper().startswith('Q') else groups[0]
-                    
-                    try:
-                        year = int(year_str)
-                        quarter = Quarter(quarter_str.upper())
-                        return {
-                            "year": year,
-                            "quarter": quarter,
-                            "period": f"{year}_{quarter}",
-                            "confidence": 0.9
-                        }
-                    except (ValueError, ValueError):
-                        continue
+        # Handle annual patterns (forms without a quarter group)
+        if f"{form}_q" not in PERIOD_PATTERN.groupindex:
+            return {
+                "year": year,
+                "quarter": Quarter.ANNUAL,
+                "period": f"{year}_Annual",
+                "confidence": 0.9
+            }
         
-        return None
+        # Handle quarterly patterns; words such as "third" are not quarters
+        try:
+            quarter = Quarter(match.group(f"{form}_q").upper())
+        except ValueError:
+            return None
+        return {
+            "year": year,
+            "quarter": quarter,
+            "period": f"{year}_{quarter}",
+            "confidence": 0.9
+        }
     
     def get_previous_periods(self, year: int, quarter: Quarter, n_periods: int = 4) -> List[Dict[str, Any]]:
         """Get list of previous periods for trend analysis"""
         periods = []
         current_year = year
-        current_quarter = quarter
-        
-        quarter_sequence = ["Q4", "Q3", "Q2", "Q1"]
+        # "Q3" -> 3; annual periods have no previous quarter and raise ValueError
+        current_quarter = int(quarter.value[1:])
         
         for i in range(n_periods):
-            # Find current quarter position
-            current_idx = quarter_sequence.index(current_quarter.value)
-            
             # Move to previous quarter
-            if current_idx == 3:  # Q1 -> go to previous year Q4
-                prev_quarter = "Q4"
-                prev_year = current_year - 1
+            if current_quarter == 1:  # Q1 -> go to previous year Q4
+                current_quarter = 4
+                current_year -= 1
             else:
-                prev_quarter = quarter_sequence[current_idx + 1]
-                prev_year = current_year
+                current_quarter -= 1
             
             periods.append({
-                "year": prev_year,
-                "quarter": Quarter(prev_quarter),
-                "period": f"{prev_year}_{prev_quarter}",
+                "year": current_year,
+                "quarter": QUARTERS_BY_NUMBER[current_quarter],
+                "period": f"{current_year}_Q{current_quarter}",
                 "sequence": i + 1
             })
-            
-            current_year = prev_year
-            current_quarter = Quarter(prev_quarter)
         
         return periods
     
@@ -98,17 +119,16 @@ class TemporalReasoningTool:
         """Compare two periods and describe the relationship"""
         year1, quarter1 = period1["year"], period1["quarter"]
         year2, quarter2 = period2["year"], period2["quarter"]
+        total_quarters_diff = _period_index(year2, quarter2) - _period_index(year1, quarter1)
+        direction = 'later' if total_quarters_diff > 0 else 'earlier'
         
-        if year1 == year2:
-            if quarter1 == quarter2:
-                relationship = "same period"
-            else:
-                quarter_diff = self._get_quarter_difference(quarter1, quarter2)
-                relationship = f"same year, {abs(quarter_diff)} quarter(s) {'later' if quarter_diff > 0 else 'earlier'}"
+        if total_quarters_diff == 0:
+            relationship = "same period"
+        elif year1 == year2:
+            relationship = f"same year, {abs(total_quarters_diff)} quarter(s) {direction}"
         else:
-            year_diff = year2 - year1
-            total_quarters_diff = year_diff * 4 + self._get_quarter_difference(quarter1, quarter2)
-            relationship = f"{abs(year_diff)} year(s) and {abs(total_quarters_diff % 4)} quarter(s) {'later' if total_quarters_diff > 0 else 'earlier'}"
+            years, quarters = divmod(abs(total_quarters_diff), 4)
+            relationship = f"{years} year(s) and {quarters} quarter(s) {direction}"
         
         return {
             "period1": period1,
@@ -120,8 +140,7 @@ class TemporalReasoningTool:
     
     def _get_quarter_difference(self, q1: Quarter, q2: Quarter) -> int:
         """Calculate difference between two quarters"""
-        quarter_values = {"Q1": 1, "Q2": 2, "Q3": 3, "Q4": 4}
-        return quarter_values[q2.value] - quarter_values[q1.value]
+        return QUARTER_NUMBERS[q2] - QUARTER_NUMBERS[q1]
 
 # Example usage
 if __name__ == "__main__":
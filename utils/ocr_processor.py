@@ -1,21 +1,112 @@
 import pytesseract
 from pdf2image import convert_from_path
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
 import tempfile
+import threading
 import os
+import numpy as np
+
+# Optional in-process OCR engine (PP-OCR models on ONNX Runtime)
+try:
+    from rapidocr_onnxruntime import RapidOCR
+    RAPIDOCR_AVAILABLE = True
+except ImportError:
+    RAPIDOCR_AVAILABLE = False
+
+# Pages OCR'd at once; each page runs in its own tesseract subprocess
+OCR_WORKERS = int(os.getenv("FAB_OCR_WORKERS", str(os.cpu_count() or 1)))
+# Grayscale render resolution for OCR; 150 dpi reads statement-sized print
+OCR_DPI = 150
+# Pages yielding less text than this are rendered again at OCR_RETRY_DPI
+OCR_MIN_PAGE_CHARS = 50
+OCR_RETRY_DPI = 300
+# pdftocairo rendering threads, leaving the other cores to OCR
+RENDER_THREADS = max(1, (os.cpu_count() or 2) // 2)
+# LSTM engine only, one uniform block of text per page (skips page layout analysis)
+TESSERACT_CONFIG = os.getenv("FAB_TESSERACT_CONFIG", "--oem 1 --psm 6")
+# "rapidocr" (when installed) or "tesseract"
+OCR_ENGINE = os.getenv("FAB_OCR_ENGINE", "rapidocr")
 
 class OCRProcessor:
+    # RapidOCR engine shared by every processor, so ONNX sessions and weights load once
+    _rapid_engine = None
+    _rapid_lock = threading.Lock()
+    
+    @classmethod
+    def _get_rapid_engine(cls):
+        if cls._rapid_engine is None:
+            with cls._rapid_lock:
+                if cls._rapid_engine is None:
+                    cls._rapid_engine = RapidOCR()
+        return cls._rapid_engine
+    
     def extract_text_with_ocr(self, pdf_path: str) -> str:
         """Extract text from PDF using OCR"""
         try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path)
-            full_text = ""
+            # Convert PDF to image files, so only the pages being OCR'd are ever decoded in memory
+            with tempfile.TemporaryDirectory() as output_folder:
+                pages = self._render(pdf_path, OCR_DPI, output_folder=output_folder)
+                texts = self._ocr_pages(pages)
             
-            for i, image in enumerate(images):
-                text = pytesseract.image_to_string(image)
-                full_text += f"--- Page {i+1} ---\n{text}\n"
+            # Small print or faint scans: retry just the near-empty pages at a higher resolution
+            for i, text in enumerate(texts):
+                if len(text.strip()) < OCR_MIN_PAGE_CHARS:
+                    retry = self._ocr_pages(self._render(pdf_path, OCR_RETRY_DPI, page_number=i + 1))
+                    if retry and len(retry[0].strip()) > len(text.strip()):
+                        texts[i] = retry[0]
             
-            return full_text
+            return "".join(f"--- Page {i+1} ---\n{text}\n" for i, text in enumerate(texts))
         except Exception as e:
             print(f"OCR failed: {e}")
-            return ""
\ No newline at end of file
+            return ""
+    
+    async def aextract_text_with_ocr(self, pdf_path: str) -> str:
+        """extract_text_with_ocr on a worker thread; pages are still OCR'd in parallel inside it"""
+        return await asyncio.to_thread(self.extract_text_with_ocr, pdf_path)
+    
+    def _render(self, pdf_path: str, dpi: int, page_number: int = None, output_folder: str = None) -> list:
+        """Grayscale JPEG pages, all or just page_number (1-based)
+        
+        With output_folder, pages are written there and their file paths are
+        returned instead of in-memory images.
+        """
+        return convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            fmt="jpeg",
+            grayscale=True,
+            thread_count=RENDER_THREADS,
+            use_pdftocairo=True,
+            first_page=page_number,
+            last_page=page_number,
+            output_folder=output_folder,
+            paths_only=output_folder is not None
+        )
+    
+    def _ocr_pages(self, pages) -> list:
+        """Text per page; pages are PIL images or image file paths"""
+        if OCR_ENGINE == "rapidocr" and RAPIDOCR_AVAILABLE:
+            return self._rapidocr_pages(pages)
+        return self._tesseract_pages(pages)
+    
+    def _rapidocr_pages(self, pages) -> list:
+        """OCR pages in-process; ONNX Runtime already spreads each page over the CPU cores"""
+        engine = self._get_rapid_engine()
+        texts = []
+        for page in pages:
+            result, _ = engine(page if isinstance(page, str) else np.asarray(page))
+            # result is [box, text, score] per detected line, or None for a blank page
+            texts.append("\n".join(line[1] for line in result or ()))
+        return texts
+    
+    def _tesseract_pages(self, pages) -> list:
+        ocr_page = partial(pytesseract.image_to_string, config=TESSERACT_CONFIG)
+        
+        # tesseract does the work outside the interpreter, so threads run pages in parallel
+        workers = min(OCR_WORKERS, len(pages))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(ocr_page, pages))
+        return [ocr_page(page) for page in pages]
@@ -1,6 +1,107 @@
 import PyPDF2
+import asyncio
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+# Optional PDFium backend; its native text extraction is far faster than PyPDF2's
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+# Results remembered per function, keyed by (absolute path, mtime, size) so an
+# edited or replaced file is parsed again
+PDF_CACHE_SIZE = 256
+
+_VALIDATE_CACHE: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_INFO_CACHE: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+_PDF_CACHE_LOCK = threading.Lock()
+# PDFium is not thread-safe, even across documents; every use of it is serialized
+_PDFIUM_LOCK = threading.Lock()
+
+def _backend_lock():
+    return _PDFIUM_LOCK if PDFIUM_AVAILABLE else nullcontext()
+
+# Files validated at once by avalidate_pdfs, each on a worker thread
+PDF_ASYNC_CONCURRENCY = 8
+
+def _file_key(file_path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+def _may_contain_text(file_path: str) -> bool:
+    """False only when the file provably has no fonts, so no page can carry extractable text
+    
+    Font resources are found by name in the raw bytes. Object streams
+    (/ObjStm) compress dictionaries and could hide them, so any file using
+    them still counts as possibly having text.
+    """
+    try:
+        with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data.find(b"/Font") != -1 or data.find(b"/ObjStm") != -1
+    except (OSError, ValueError):
+        return True
+
+def _cached(cache: OrderedDict, file_path: str, compute: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """compute(file_path) memoized in cache; failed results are not kept"""
+    key = _file_key(file_path)
+    if key is None:
+        with _backend_lock():
+            return compute(file_path)
+    with _PDF_CACHE_LOCK:
+        if key in cache:
+            cache.move_to_end(key)
+            return dict(cache[key])
+    
+    with _backend_lock():
+        result = compute(file_path)
+    if result.get("is_valid"):
+        with _PDF_CACHE_LOCK:
+            cache[key] = result
+            while len(cache) > PDF_CACHE_SIZE:
+                cache.popitem(last=False)
+    return dict(result)
+
+class _PdfiumPage:
+    def __init__(self, document, index: int):
+        self._document = document
+        self._index = index
+    
+    def extract_text(self) -> str:
+        page = self._document[self._index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+
+class _PdfiumReader:
+    """The PyPDF2.PdfReader subset PDFValidator uses, backed by PDFium
+    
+    PDFium is not thread-safe: its pages are never read on the thread pool, and
+    PDFValidator only opens documents while holding _PDFIUM_LOCK.
+    """
+    
+    def __init__(self, file_path: str):
+        self._document = pdfium.PdfDocument(file_path)
+        self.pages = [_PdfiumPage(self._document, i) for i in range(len(self._document))]
+        self.metadata = {key: value for key, value in self._document.get_metadata_dict().items() if value}
+    
+    @property
+    def is_encrypted(self) -> bool:
+        # Revision -1 means the document has no security handler
+        return pdfium_c.FPDF_GetSecurityHandlerRevision(self._document.raw) != -1
 
 class PDFValidator:
     """Utility class for PDF validation and information extraction"""
@@ -8,27 +109,76 @@ class PDFValidator:
     @staticmethod
     def validate_pdf(file_path: str) -> Dict[str, Any]:
         """Validate PDF file and extract basic information"""
+        return _cached(_VALIDATE_CACHE, file_path, PDFValidator._validate_pdf)
+    
+    @staticmethod
+    async def avalidate_pdf(file_path: str) -> Dict[str, Any]:
+        """validate_pdf on a worker thread, so the event loop keeps running"""
+        return await asyncio.to_thread(PDFValidator.validate_pdf, file_path)
+    
+    @staticmethod
+    async def aget_pdf_info(file_path: str) -> Dict[str, Any]:
+        """get_pdf_info on a worker thread, so the event loop keeps running"""
+        return await asyncio.to_thread(PDFValidator.get_pdf_info, file_path)
+    
+    @staticmethod
+    async def avalidate_pdfs(file_paths: List[str], concurrency: int = PDF_ASYNC_CONCURRENCY) -> List[Dict[str, Any]]:
+        """Validate many files, at most `concurrency` at once; results follow file_paths order"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def validate(file_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await PDFValidator.avalidate_pdf(file_path)
+        
+        return await asyncio.gather(*(validate(file_path) for file_path in file_paths))
+    
+    @staticmethod
+    def _load_reader(file_path: str):
+        """Open file_path once with PDFium when installed, else PyPDF2
+        
+        Given a path, PyPDF2.PdfReader reads the whole file into memory and closes it.
+        """
+        if PDFIUM_AVAILABLE:
+            return _PdfiumReader(file_path)
+        return PyPDF2.PdfReader(file_path)
+    
+    @staticmethod
+    def _page_texts(pdf_reader, count: int = 3) -> List[str]:
+        """Text of the first count pages, "" for pages without any
+        
+        Extracted serially: pages of one PdfReader share its stream and resolve
+        objects lazily while extracting, so they can't be read from several threads.
+        """
+        return [page.extract_text() or "" for page in pdf_reader.pages[:count]]
+    
+    @staticmethod
+    def _validate_pdf(file_path: str, pdf_reader=None,
+                      page_texts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """validate_pdf, reusing a reader and first-page texts the caller already has"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                info = {
-                    "is_valid": True,
-                    "total_pages": len(pdf_reader.pages),
-                    "has_text": False,
-                    "file_size_mb": round(Path(file_path).stat().st_size / (1024 * 1024), 2),
-                    "metadata": pdf_reader.metadata or {}
-                }
-                
-                # Check if PDF contains extractable text
-                for page in pdf_reader.pages[:3]:  # Check first 3 pages
-                    text = page.extract_text()
-                    if text and len(text.strip()) > 100:  # Reasonable amount of text
-                        info["has_text"] = True
-                        break
-                
-                return info
-                
+            if pdf_reader is None:
+                pdf_reader = PDFValidator._load_reader(file_path)
+            
+            info = {
+                "is_valid": True,
+                "total_pages": len(pdf_reader.pages),
+                "has_text": False,
+                "file_size_mb": round(Path(file_path).stat().st_size / (1024 * 1024), 2),
+                "metadata": pdf_reader.metadata or {}
+            }
+            
+            # Check if PDF contains extractable text
+            if page_texts is None:
+                # Scanned (image-only) PDFs skip text extraction entirely
+                if not _may_contain_text(file_path):
+                    page_texts = ()
+                else:
+                    # Check first 3 pages, stopping at the first with text
+                    page_texts = (page.extract_text() or "" for page in pdf_reader.pages[:3])
+            info["has_text"] = any(len(text.strip()) > 100 for text in page_texts)  # Reasonable amount of text
+            
+            return info
+            
         except Exception as e:
             return {
                 "is_valid": False,
@@ -39,8 +189,8 @@ class PDFValidator:
     def extract_page_text(file_path: str, page_number: int) -> str:
         """Extract text from specific page"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
+            with _backend_lock():
+                pdf_reader = PDFValidator._load_reader(file_path)
                 if page_number < len(pdf_reader.pages):
                     return pdf_reader.pages[page_number].extract_text() or ""
                 return ""
@@ -51,31 +201,43 @@ class PDFValidator:
     @staticmethod
     def get_pdf_info(file_path: str) -> Dict[str, Any]:
         """Get comprehensive PDF information"""
-        validation = PDFValidator.validate_pdf(file_path)
+        return _cached(_INFO_CACHE, file_path, PDFValidator._get_pdf_info)
+    
+    @staticmethod
+    def _get_pdf_info(file_path: str) -> Dict[str, Any]:
+        # One parse and one text extraction serve both the validation and the previews
+        try:
+            pdf_reader = PDFValidator._load_reader(file_path)
+            if _may_contain_text(file_path):
+                page_texts = PDFValidator._page_texts(pdf_reader)
+            else:
+                page_texts = [""] * min(3, len(pdf_reader.pages))
+        except Exception as e:
+            return {
+                "is_valid": False,
+                "error": str(e)
+            }
+        validation = PDFValidator._validate_pdf(file_path, pdf_reader, page_texts)
         
         if not validation["is_valid"]:
             return validation
         
         # Additional info for valid PDFs
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            info = {
-                **validation,
-                "encrypted": pdf_reader.is_encrypted,
-                "pages": []
-            }
-            
-            # Sample text from first few pages
-            for i in range(min(3, len(pdf_reader.pages))):
-                text = pdf_reader.pages[i].extract_text() or ""
-                info["pages"].append({
-                    "page_number": i + 1,
-                    "text_preview": text[:200] + "..." if len(text) > 200 else text,
-                    "has_content": len(text.strip()) > 0
-                })
-            
-            return info
+        info = {
+            **validation,
+            "encrypted": pdf_reader.is_encrypted,
+            "pages": []
+        }
+        
+        # Sample text from first few pages
+        for i, text in enumerate(page_texts):
+            info["pages"].append({
+                "page_number": i + 1,
+                "text_preview": text[:200] + "..." if len(text) > 200 else text,
+                "has_content": len(text.strip()) > 0
+            })
+        
+        return info
 
 # Example usage
 if __name__ == "__main__":